@@ -1,10 +1,11 @@
 #analyze_facs.py
-from facsforge.core.loader import load_experiment
-from facsforge.core.gating_engine import run_gating_pipeline
 import os
 
-def cmd_analyze_facs(fcs_file, config_file, index_csv, outdir):
+def cmd_analyze_facs(fcs_file, config_file, index_csv, outdir, use_cache=True):
+    from facsforge.core.loader import load_experiment
+    from facsforge.core.gating_engine import run_gating_pipeline
+
     os.makedirs(outdir, exist_ok=True)
-    experiment = load_experiment(config_file)
-    run_gating_pipeline(fcs_file, index_csv, experiment,  outdir)
+    experiment = load_experiment(config_file, use_cache=use_cache)
+    run_gating_pipeline(fcs_file, index_csv, experiment,  outdir, use_cache=use_cache)
     print(f"Analysis complete. Output at: {outdir}")
\ No newline at end of file
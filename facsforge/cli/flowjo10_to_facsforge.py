@@ -27,24 +27,31 @@ so we must infer or leave as empty lists.
 """
 
 import zipfile
-import xml.etree.ElementTree as ET
-import yaml
+from facsforge.utils import scan_workspace
+from facsforge.utils.cache import cached_by_file
+from facsforge.cli.flowjo9_to_facsforge import extract_celltypes_v9, extract_panel_v9
 
 # =====================================================================
 # ZIP LOADING
 # =====================================================================
 
 def load_flowjo10_xml(wsp_path):
-    """Load FlowJo v10 workspace.xml from inside a ZIP .wsp file."""
+    """
+    Stream-parse FlowJo v10 workspace.xml from inside a ZIP .wsp file.
+    Returns the scanned workspace dicts (see scan_workspace).
+    """
     try:
         with zipfile.ZipFile(wsp_path, "r") as z:
-            for name in z.namelist():
-                if name.lower().endswith(".xml") and "workspace" in name.lower():
-                    return ET.fromstring(z.read(name))
-            # fallback: any XML
-            for name in z.namelist():
-                if name.lower().endswith(".xml"):
-                    return ET.fromstring(z.read(name))
+            xml_names = [n for n in z.namelist() if n.lower().endswith(".xml")]
+            # prefer workspace.xml, fall back to any XML member
+            chosen = next(
+                (n for n in xml_names if "workspace" in n.lower()),
+                xml_names[0] if xml_names else None,
+            )
+            if chosen is None:
+                raise RuntimeError(f"No workspace XML found inside {wsp_path}")
+            with z.open(chosen) as fh:
+                return scan_workspace(fh)
     except zipfile.BadZipFile:
         raise RuntimeError("This is not a FlowJo v10 ZIP-based WSP (use v9 parser).")
 
@@ -53,7 +60,7 @@ def load_flowjo10_xml(wsp_path):
 # PANEL EXTRACTION
 # =====================================================================
 
-def extract_panel_v10(root):
+def extract_panel_v10(workspace):
     """
     FlowJo v10 stores parameters differently from v9.
     Typical structure:
@@ -67,28 +74,12 @@ def extract_panel_v10(root):
     This parser provides a minimal panel mapping.
     """
 
-    panel = {}
-
     # 1) Try FlowJo v10 Parameter nodes (some workspaces use them)
-    for p in root.findall(".//Parameter"):
-        name = p.get("name") or p.get("shortName") or p.get("longName")
-        if not name:
-            continue
-
-        fluor = None
-        det = p.find("Detector")
-        if det is not None:
-            fluor = det.text
-
-        panel[name] = {
-            "fluor": fluor,
-            "role": None,
-            "ignore": False,
-        }
+    panel = extract_panel_v9(workspace)
 
     # 2) Fallback: Keyword-based detector/channel mapping
     # Example: P1N = FSC-A  /  P1D = FITC
-    keywords = {kw.get("name"): kw.get("value") for kw in root.findall(".//Keyword")}
+    keywords = workspace["keywords"]
     for key, val in keywords.items():
         if key.endswith("N") and val:
             channel = val
@@ -102,17 +93,11 @@ def extract_panel_v10(root):
     return panel
 
 
-
-def parse_gate_v10(g_el):
-    return parse_gatingml_gate(g_el)
-
-
-
 # =====================================================================
 # EXTRACT GATES → FACSForge STRUCTURE
 # =====================================================================
 
-def extract_gates_v10(root):
+def extract_gates_v10(workspace):
     """
     FlowJo v10 stores populations like:
 
@@ -121,43 +106,23 @@ def extract_gates_v10(root):
         </Population>
 
     We map:
-        population → celltypes entry
+        population → celltypes entry (same as v9)
     """
-
-    celltypes = {}
-
-    for pop in root.findall(".//Population"):
-        name = pop.get("name")
-        parent = pop.get("parent")
-        gate_el = pop.find("Gate")
-
-        if gate_el is None:
-            continue
-
-        gate_def = parse_gate_v10(gate_el)
-        if gate_def is None:
-            continue
-
-        celltypes[name] = {
-            "parent": parent,
-            "gate": gate_def,
-            "positive": [],
-            "negative": [],
-        }
-
-    return celltypes
+    return extract_celltypes_v9(workspace)
 
 
 # =====================================================================
 # TOP-LEVEL CONVERTER
 # =====================================================================
 
+@cached_by_file("flowjo10")
 def convert_v10(wsp_path, experiment_name="FlowJoV10"):
     """
     Convert FlowJo v10 ZIP-based WSP → FACSForge dict.
+    Results are cached on disk by WSP content (pass use_cache=False to re-parse).
     """
 
-    root = load_flowjo10_xml(wsp_path)
+    workspace = load_flowjo10_xml(wsp_path)
 
     return {
         "metadata": {
@@ -166,8 +131,8 @@ def convert_v10(wsp_path, experiment_name="FlowJoV10"):
             "date": None,
             "notes": "",
         },
-        "panel": extract_panel_v10(root),
-        "celltypes": extract_gates_v10(root),
+        "panel": extract_panel_v10(workspace),
+        "celltypes": extract_gates_v10(workspace),
         "umap": {
             "enabled": False
         },
@@ -1,15 +1,18 @@
-import xml.etree.ElementTree as ET
-from facsforge.utils import parse_gatingml_gate
+from facsforge.utils import scan_workspace
+from facsforge.utils.cache import cached_by_file
+from facsforge.utils.logging import log_debug
 
 # ============================================================
 # XML Loader
 # ============================================================
 
 def load_flowjo9_xml(path):
-    with open(path, "rb") as f:
-        xml_bytes = f.read()
+    """
+    Stream-parse a FlowJo v9 workspace.
+    Returns the scanned workspace dicts (see scan_workspace).
+    """
     try:
-        return ET.fromstring(xml_bytes)
+        return scan_workspace(path)
     except Exception as e:
         raise RuntimeError(f"Failed to parse FlowJo v9 XML: {e}")
 
@@ -17,7 +20,7 @@ def load_flowjo9_xml(path):
 # Panel extraction
 # ============================================================
 
-def extract_panel_v9(root):
+def extract_panel_v9(workspace):
     """
     Generate panel structure matching FACSForge schema:
     
@@ -30,16 +33,7 @@ def extract_panel_v9(root):
 
     panel = {}
 
-    for p in root.findall(".//Parameter"):
-        name = p.get("name") or p.get("shortName") or p.get("longName")
-        if not name:
-            continue
-
-        fluor = None
-        det = p.find("Detector")
-        if det is not None:
-            fluor = det.text
-
+    for name, fluor in workspace["parameters"].items():
         panel[name] = {
             "fluor": fluor,
             "role": None,
@@ -48,67 +42,28 @@ def extract_panel_v9(root):
 
     return panel
 
-def parse_gate_v9(g_el):
-    data = parse_gatingml_gate(g_el)
-    return data
-
 
 # ============================================================
 # Population → celltypes extraction
 # ============================================================
 
-def extract_population_tree(root):
+def extract_population_tree(workspace):
     """
-    Extract FlowJo v9 population hierarchy using xml.etree (no getparent()).
+    Extract FlowJo v9 population hierarchy (nesting of <Population> nodes).
 
     Returns:
         pop_parent:  { pop_name → parent population name or None }
         pop_gateid: { pop_name → gate_id or None }
     """
+    return dict(workspace["pop_parent"]), dict(workspace["pop_gateid"])
 
-    pop_parent = {}
-    pop_gateid = {}
-
-    # Walk tree manually to track parents
-    def recurse(el, parent_pop_name=None):
-        # Only handle <Population> nodes
-        if el.tag == "Population":
-            name = el.get("name")
-            pop_parent[name] = parent_pop_name
-
-            gate_el = el.find("gate")
-            if gate_el is not None:
-                pop_gateid[name] = gate_el.get("ref")
-            else:
-                pop_gateid[name] = None
-
-            parent_pop_name = name  # this becomes new parent for children
-
-        # Recurse into children
-        for child in el:
-            recurse(child, parent_pop_name)
-
-    recurse(root)
-    return pop_parent, pop_gateid
-
-def extract_celltypes_v9(root):
+def extract_celltypes_v9(workspace):
     celltypes = {}
 
-    for pop in root.findall(".//Population"):
-        name = pop.get("name")
-        parent = pop.get("parent")
-        gate_el = pop.find("Gate")
-
-        if gate_el is None:
-            continue
-
-        gate_def = parse_gate_v9(gate_el)
-        if gate_def is None:
-            continue
-
+    for name, pop in workspace["populations"].items():
         celltypes[name] = {
-            "parent": parent,
-            "gate": gate_def,
+            "parent": pop["parent"],
+            "gate": pop["gate"],
             "positive": [],
             "negative": [],
         }
@@ -116,99 +71,87 @@ def extract_celltypes_v9(root):
     return celltypes
 
 
-def extract_gate_parents(root):
+def extract_gate_parents(workspace):
     """
     Extracts gate_id → parent_id mapping from FlowJo v9 XML.
     Returns:
         parents: dict { gate_id: parent_gate_id or None }
     """
-    ns = {"g": "http://www.isac-net.org/std/Gating-ML/v2.0/gating"}
-
-    parents = {}
+    return dict(workspace["gate_parents"])
 
-    for gate_el in root.findall(".//g:Gate", ns):
-        gid = gate_el.get("{http://www.isac-net.org/std/Gating-ML/v2.0/gating}id")
-        pid = gate_el.get("{http://www.isac-net.org/std/Gating-ML/v2.0/gating}parent_id")
-        parents[gid] = pid  # may be None
-    return parents
-
-def extract_gate_names(root):
+def extract_gate_names(workspace):
     """
     Returns mapping gate_id → gate_name.
     """
-    ns = {"g": "http://www.isac-net.org/std/Gating-ML/v2.0/gating"}
-    names = {}
+    return dict(workspace["gate_names"])
+
+def _gate_path_from_ids(pop_name, pop_gateid, gate_parents, gid_to_pop):
+    """
+    Rebuild a gate path by following the Gating-ML parent_id links upwards.
+    Returns: [top population, ..., pop_name]
+    """
+    path = [pop_name]
+    gid = gate_parents.get(pop_gateid.get(pop_name))
 
-    for gate_el in root.findall(".//g:Gate", ns):
-        gid = gate_el.get("{http://www.isac-net.org/std/Gating-ML/v2.0/gating}id")
-        name_el = gate_el.find("./name")
-        if name_el is not None:
-            names[gid] = name_el.text.strip()
-    return names
+    while gid is not None:
+        name = gid_to_pop.get(gid)
+        if name is None or name in path:
+            break
+        path.append(name)
+        gid = gate_parents.get(gid)
 
-def build_yaml_hierarchy(celltypes, root):
+    path.reverse()
+    return path
+
+def build_yaml_hierarchy(celltypes, workspace):
     """
     Insert parent relationships into celltypes using hierarchy from ExternalPopNode.
+    Populations without an ExternalPopNode fall back to the parent_id of their gate.
     """
 
-    hierarchy = extract_gate_path_from_external_nodes(root)
+    hierarchy = extract_gate_path_from_external_nodes(workspace)
+
+    # Lookup tables for the gate id fallback - built once, O(1) per celltype.
+    # FlowJo names every gate after its population.
+    pop_gateid = workspace["pop_gateid"]
+    gate_parents = extract_gate_parents(workspace)
+    gid_to_pop = extract_gate_names(workspace)
 
     for pop_name, obj in celltypes.items():
         path = hierarchy.get(pop_name)
 
-        # Store gate_path if available
-        if path:
-            obj["gate_path"] = path
+        if not path:
+            path = _gate_path_from_ids(pop_name, pop_gateid, gate_parents, gid_to_pop)
 
-            # Assign parent from path if possible
-            if len(path) >= 2:
-                obj["parent"] = path[-2]
-            else:
-                obj["parent"] = None
+        obj["gate_path"] = path
 
+        # Assign parent from path if possible
+        if len(path) >= 2:
+            obj["parent"] = path[-2]
         else:
-            obj["gate_path"] = [pop_name]
             obj["parent"] = None
 
-def extract_gate_path_from_external_nodes(root):
+def extract_gate_path_from_external_nodes(workspace):
     """
     Extract gating hierarchy from FlowJo ExternalPopNode entries.
     Returns: dict { population_name -> gate_path[] }
     """
-    paths = {}
-
-    for node in root.findall(".//ExternalPopNode"):
-        pop = node.find(".//BD_CellView_Lens")
-        if pop is None:
-            continue
-
-        name = pop.get("population")
-        raw = pop.get("path")
-
-        if not name or not raw:
-            continue
-
-        # Normalize and split
-        path = [p.strip() for p in raw.split("/") if p.strip()]
-
-        paths[name] = path
-
-    return paths
+    return dict(workspace["external_paths"])
 
 # ============================================================
 # Top-level conversion
 # ============================================================
 
+@cached_by_file("flowjo9")
 def convert_v9(wsp_path, experiment_name="FlowJoV9"):
-    root = load_flowjo9_xml(wsp_path)
+    workspace = load_flowjo9_xml(wsp_path)
 
-    print ("flowjo9_to_facsforge - working!")
+    log_debug("flowjo9_to_facsforge - working!")
 
-    celltypes = extract_celltypes_v9(root)
-    paths = extract_gate_path_from_external_nodes(root)
-    
-    build_yaml_hierarchy(celltypes, root )
-    panel = extract_panel_v9(root)
+    celltypes = extract_celltypes_v9(workspace)
+
+    build_yaml_hierarchy(celltypes, workspace)
+    panel = extract_panel_v9(workspace)
 
     return {
         "metadata": {
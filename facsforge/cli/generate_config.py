@@ -1,18 +1,10 @@
 #gernerate_config.py
-import yaml
-import pandas as pd
-from flowkit import Sample
-from facsforge.core.loader import flatten_columns
-
-def normalize_channel_name(ch):
-    if isinstance(ch, tuple):
-        return ch[0]
-    return str(ch)
+from flowio import FlowData
+from facsforge.utils.yaml_io import dump_yaml
 
 def cmd_generate_config(fcs_file, output):
-    sample = Sample(fcs_file)
-    df = sample.as_dataframe(source="raw")
-    columns = flatten_columns(df)
+    # only the TEXT segment is needed for the channel names - do not decode events
+    fcs = FlowData(fcs_file, only_text=True)
 
     # Basic skeleton
     config = {
@@ -22,7 +14,11 @@ def cmd_generate_config(fcs_file, output):
             "date": None,
             "notes": ""
         },
-        "panel": {},
+        # all channels ($PnN), ignored until the user assigns them
+        "panel": {
+            pnn: {"fluor": None, "role": None, "ignore": True}
+            for pnn in fcs.pnn_labels
+        },
         "ignore_markers": [],
         "compensation": {"source": "none"},
         "celltypes": {},
@@ -30,17 +26,8 @@ def cmd_generate_config(fcs_file, output):
         "umap": {"enabled": False}
     }
 
-    # Add all channels as ignore
-    for ch in columns:
-        key = normalize_channel_name(ch)
-        config["panel"][key] = {
-            "fluor": None,
-            "role": None,
-            "ignore": True
-        }
-
     with open(output, "w") as f:
-        yaml.dump(config, f)
+        dump_yaml(config, f)
 
     print(f"Wrote config to {output}")
     
\ No newline at end of file
@@ -1,14 +1,85 @@
 import argparse
-import yaml
+import os
 import sys
-from facsforge.core.validate_schema import validate_config
-from facsforge.core.merge import merge_configs, load_existing_yaml
-from datetime import date
 
-print(">>> facsforge.cli.main loaded")
+# Heavy dependencies (yaml, jsonschema, pandas, flowkit, ...) are imported
+# inside the subcommand handlers, so `facsforge --help` and the converters
+# only pay for what they use.
 
 
-def main():
+def _write_yaml(data, path):
+    from facsforge.utils.yaml_io import dump_yaml
+
+    outdir = os.path.dirname(path)
+    if outdir:
+        os.makedirs(outdir, exist_ok=True)
+
+    with open(path, "w") as f:
+        dump_yaml(data, f, sort_keys=False)
+
+
+def _write_flowjo_yaml(data, path):
+    """Fill in the defaults FlowJo does not provide, validate and write."""
+    from datetime import date
+    from facsforge.core.validate_schema import validate_config
+
+    if not data.get("metadata", {}).get("date"):
+        today = date.today().strftime("%Y-%m-%d")
+        data.setdefault("metadata", {})["date"] = today
+
+    if data.get("compensation", {}).get("path") is None:
+        data.setdefault("compensation", {})["path"] = ""
+
+    validate_config(data)
+
+    _write_yaml(data, path)
+
+
+# ------------------------------------------------------------
+# Subcommand handlers
+# ------------------------------------------------------------
+def _generate_config(args):
+    from facsforge.cli.generate_config import cmd_generate_config
+    return cmd_generate_config(args.fcs, args.out)
+
+
+def _analyze_facs(args):
+    from facsforge.cli.analyze_facs import cmd_analyze_facs
+    return cmd_analyze_facs(
+        args.fcs,
+        args.config,
+        args.index_csv,
+        args.outdir,
+        use_cache=not args.no_cache,
+    )
+
+
+def _flowjo9_to_facsforge(args):
+    from facsforge.cli.flowjo9_to_facsforge import convert_v9
+    data = convert_v9(args.wsp, args.name, use_cache=not args.no_cache)
+
+    _write_flowjo_yaml(data, args.out)
+    return 0
+
+
+def _flowjo10_to_facsforge(args):
+    from facsforge.cli.flowjo10_to_facsforge import convert_v10
+    data = convert_v10(args.wsp, args.name, use_cache=not args.no_cache)
+
+    _write_flowjo_yaml(data, args.out)
+    return 0
+
+
+COMMANDS = {
+    "generate-config": _generate_config,
+    "analyze-facs": _analyze_facs,
+    "flowjo9_to_facsforge": _flowjo9_to_facsforge,
+    "flowjo10_to_facsforge": _flowjo10_to_facsforge,
+}
+
+
+def main(argv=None):
+    """Command line entry point; argv defaults to sys.argv[1:]."""
     parser = argparse.ArgumentParser(
         prog="facsforge",
         description="FACSForge: Flow Cytometry analysis and YAML-driven gating."
@@ -37,6 +108,8 @@ def main():
     analyze.add_argument("--index-csv", required=True, help="Index sorted cells CSV")
     analyze.add_argument("--config", required=True, help="YAML experiment config")
     analyze.add_argument("--outdir", required=True, help="Output directory")
+    analyze.add_argument("--no-cache", action="store_true",
+                         help="Re-validate the config, recompute thresholds and redraw all plots")
 
     # ------------------------------------------------------------
     # flowjo9 → yaml
@@ -48,6 +121,8 @@ def main():
     flowjo9.add_argument("--wsp", required=True)
     flowjo9.add_argument("--out", default="facsforge.yaml")
     flowjo9.add_argument("--name", default="FlowJoV9")
+    flowjo9.add_argument("--no-cache", action="store_true",
+                         help="Re-parse the WSP even if a cached result exists")
 
     # ------------------------------------------------------------
     # flowjo10 → yaml
@@ -59,72 +134,18 @@ def main():
     flowjo10.add_argument("--wsp", required=True)
     flowjo10.add_argument("--out", default="facsforge.yaml")
     flowjo10.add_argument("--name", default="FlowJoV10")
+    flowjo10.add_argument("--no-cache", action="store_true",
+                          help="Re-parse the WSP even if a cached result exists")
 
     # ------------------------------------------------------------
     # Parse args
     # ------------------------------------------------------------
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     # ------------------------------------------------------------
     # Dispatch
     # ------------------------------------------------------------
-    if args.command == "generate-config":
-        from facsforge.cli.generate_config import cmd_generate_config
-        return cmd_generate_config(args.fcs, args.out)
-
-    elif args.command == "analyze-facs":
-        from facsforge.cli.analyze_facs import cmd_analyze_facs
-        return cmd_analyze_facs(
-            args.fcs,
-            args.config,
-            args.index_csv,
-            args.outdir
-        )
-
-    elif args.command == "flowjo9_to_facsforge":
-        from facsforge.cli.flowjo9_to_facsforge import convert_v9
-        data = convert_v9(args.wsp, args.name)
-
-        existing = load_existing_yaml(args.out)
-        merged = merge_configs(existing, data)
-
-        if not data.get("metadata", {}).get("date"):
-            today = date.today().strftime("%Y-%m-%d")
-            data.setdefault("metadata", {})["date"] = today
-
-        if data.get("compensation", {}).get("path") is None:
-            data.setdefault("compensation", {})["path"] = ""
-
-        validate_config(data)
-
-        with open(args.out, "w") as f:
-            yaml.safe_dump(data, f, sort_keys=False)
-
-        return 0
-
-    elif args.command == "flowjo10_to_facsforge":
-        from facsforge.cli.flowjo10_to_facsforge import convert_v10
-        data = convert_v10(args.wsp, args.name)
-
-        if not data.get("metadata", {}).get("date"):
-            today = date.today().strftime("%Y-%m-%d")
-            data.setdefault("metadata", {})["date"] = today
-
-        if data.get("compensation", {}).get("path") is None:
-            data.setdefault("compensation", {})["path"] = ""
-
-        validate_config(data)
-
-        with open(args.out, "w") as f:
-            yaml.safe_dump(data, f, sort_keys=False)
-
-        return 0
-
-    else:
-        parser.print_help()
-        return 1
-
+    return COMMANDS[args.command](args)
 
 if __name__ == "__main__":
-    print(">>> CLI ENTRYPOINT HIT", sys.argv)
-    main()
+    sys.exit(main())
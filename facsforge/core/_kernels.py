@@ -0,0 +1,193 @@
+"""
+Compiled inner loops of the gating engine.
+
+Numba (installed with umap-learn) is used when available; without it the
+same functions run as plain NumPy code with identical results.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+    from flowutils.gating import points_in_polygon
+
+
+if HAS_NUMBA:
+
+    @njit(parallel=True, cache=True)
+    def marker_rules_mask(X, rows, idx, thr, above):
+        """
+        For each event X[rows[r]]: True if every marker passes its rule,
+        X[., idx[k]] > thr[k] (above[k]) or X[., idx[k]] <= thr[k].
+        All rules are checked in one pass over the events.
+        """
+        out = np.empty(rows.size, dtype=np.bool_)
+        for r in prange(rows.size):
+            i = rows[r]
+            ok = True
+            for k in range(idx.size):
+                v = X[i, idx[k]]
+                if above[k]:
+                    ok = v > thr[k]
+                else:
+                    ok = v <= thr[k]
+                if not ok:
+                    break
+            out[r] = ok
+        return out
+
+    @njit(parallel=True, cache=True)
+    def _column_ranges(X, idx):
+        """(min, max) of the columns idx of X; NaN if a column has NaN."""
+        lo = np.empty(idx.size)
+        hi = np.empty(idx.size)
+        for k in prange(idx.size):
+            mn = np.inf
+            mx = -np.inf
+            for r in range(X.shape[0]):
+                v = X[r, idx[k]]
+                if v != v:
+                    mn = mx = np.nan
+                    break
+                mn = min(mn, v)
+                mx = max(mx, v)
+            lo[k] = mn
+            hi[k] = mx
+        return lo, hi
+
+    @njit(parallel=True, cache=True)
+    def _histograms(X, idx, edges):
+        """
+        Counts of X[:, idx[k]] in the equal-width bins edges[k], binned
+        exactly like np.histogram (computed bin, corrected against the
+        edges; the last bin includes its right edge).
+        """
+        nb = edges.shape[1] - 1
+        out = np.zeros((idx.size, nb), dtype=np.int64)
+        for k in prange(idx.size):
+            e = edges[k]
+            first = e[0]
+            last = e[nb]
+            norm = nb / (last - first)
+            for r in range(X.shape[0]):
+                v = X[r, idx[k]]
+                if not (v >= first and v <= last):
+                    continue
+                b = int((v - first) * norm)
+                if b == nb:
+                    b -= 1
+                if v < e[b]:
+                    b -= 1
+                elif b != nb - 1 and v >= e[b + 1]:
+                    b += 1
+                out[k, b] += 1
+        return out
+
+    def column_histograms(X, idx, bins):
+        """
+        np.histogram(X[:, i], bins=bins) for every column i in idx, all
+        columns in parallel and without copying them.
+
+        Returns: (hist[len(idx), bins], edges[len(idx), bins + 1])
+        """
+        lo, hi = _column_ranges(X, idx)
+        edges = np.empty((idx.size, bins + 1))
+        for k in range(idx.size):
+            first, last = float(lo[k]), float(hi[k])
+            if not (np.isfinite(first) and np.isfinite(last)):
+                raise ValueError(
+                    f"autodetected range of [{first}, {last}] is not finite"
+                )
+            if first == last:
+                first, last = first - 0.5, last + 0.5
+            edges[k] = np.linspace(first, last, bins + 1)
+        return _histograms(X, idx, edges), edges
+
+    @njit(parallel=True, cache=True)
+    def rectangle_mask(X, rows, i, j, x_lo, x_hi, y_lo, y_hi):
+        """
+        For each event X[rows[r]]: True if x_lo <= X[., i] < x_hi and
+        y_lo <= X[., j] < y_hi (flowkit's RectangleGate), in one pass.
+        """
+        out = np.empty(rows.size, dtype=np.bool_)
+        for r in prange(rows.size):
+            x = X[rows[r], i]
+            y = X[rows[r], j]
+            out[r] = x >= x_lo and x < x_hi and y >= y_lo and y < y_hi
+        return out
+
+    @njit(parallel=True, cache=True)
+    def polygon_mask(vx, vy, x, y):
+        """
+        True for the points (x[p], y[p]) inside the polygon (vx, vy).
+
+        Same winding number test (odd = inside) as flowutils'
+        points_in_polygon, used by flowkit's PolygonGate; points
+        outside the polygon's bounding box are rejected up front.
+        """
+        x_lo, x_hi = vx.min(), vx.max()
+        y_lo, y_hi = vy.min(), vy.max()
+        m = vx.size
+
+        out = np.empty(x.size, dtype=np.bool_)
+        for p in prange(x.size):
+            px = x[p]
+            py = y[p]
+            if px < x_lo or px > x_hi or py < y_lo or py > y_hi:
+                out[p] = False
+                continue
+            wind = 0
+            for i in range(m):
+                j = i + 1 if i + 1 < m else 0
+                left = (vx[j] - vx[i]) * (py - vy[i]) - (px - vx[i]) * (vy[j] - vy[i])
+                if vy[i] <= py:
+                    if vy[j] > py and left > 0:
+                        wind += 1
+                elif vy[j] <= py and left < 0:
+                    wind -= 1
+            out[p] = wind % 2 != 0
+        return out
+
+else:
+
+    def marker_rules_mask(X, rows, idx, thr, above):
+        out = np.ones(rows.size, dtype=bool)
+        for k in range(idx.size):
+            v = X[rows, idx[k]]
+            out &= (v > thr[k]) if above[k] else (v <= thr[k])
+        return out
+
+    def column_histograms(X, idx, bins):
+        hist = np.empty((idx.size, bins), dtype=np.int64)
+        edges = np.empty((idx.size, bins + 1))
+        for k in range(idx.size):
+            hist[k], edges[k] = np.histogram(X[:, idx[k]].astype(np.float64), bins=bins)
+        return hist, edges
+
+    def rectangle_mask(X, rows, i, j, x_lo, x_hi, y_lo, y_hi):
+        x = X[rows, i]
+        y = X[rows, j]
+        out = x >= x_lo
+        out &= x < x_hi
+        out &= y >= y_lo
+        out &= y < y_hi
+        return out
+
+    def polygon_mask(vx, vy, x, y):
+        # the winding number is only computed for the events inside
+        # the polygon's bounding box
+        mask = x >= vx.min()
+        mask &= x <= vx.max()
+        mask &= y >= vy.min()
+        mask &= y <= vy.max()
+
+        candidates = np.flatnonzero(mask)
+        if len(candidates):
+            mask[candidates] = points_in_polygon(
+                np.column_stack((vx, vy)),
+                np.column_stack((x[candidates], y[candidates])),
+            )
+        return mask
@@ -1,14 +1,18 @@
+import csv
+import hashlib
+import io
+
 import numpy as np
 import pandas as pd
+from collections import defaultdict, deque
 from pathlib import Path
 
-import flowkit as fk
-from flowkit._models.gates import *
-# flowutils and fcsparser available for extensions later
-from flowkit import Dimension
+from flowio import FlowData
 
 from facsforge.core.thresholds import compute_auto_thresholds
+from facsforge.core._kernels import marker_rules_mask, polygon_mask, rectangle_mask
 from facsforge.core.transforms import prepare_markers
+from facsforge.utils.cache import CODE_VERSION, cached_call, file_digest
 from facsforge.utils.logging import log_info, log_warn, log_error
 from facsforge.core.pita import get_logicle, xform, scale_info
 
@@ -16,8 +20,16 @@ from .index import load_index_csv, merge_index_with_fcs, check_well_conflicts
 
 import warnings
 
+# pyarrow's multithreaded CSV writer is ~10x faster than DataFrame.to_csv
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
 ## for the plotting
 import matplotlib.pyplot as plt
+from PIL import Image
 import re
 
 def safe_filename(s: str) -> str:
@@ -50,39 +62,6 @@ def merge_with_index_data(df_raw, index_paths):
     return index_all
     
 
-def _apply_compensation(sample, experiment):
-    """
-    Applies compensation based on config.
-    """
-    comp_cfg = experiment.get("compensation", {"source": "fcs"})
-
-    source = comp_cfg.get("source", "fcs")
-
-    if source == "none":
-        log_info("No compensation applied (source: none).")
-        return sample.get_events(source="raw"), sample.channels
-
-    if source == "fcs":
-        if not sample.has_comp_matrix:
-            log_warn("FCS file does NOT contain a compensation matrix.")
-            return sample.get_events(), sample.channels
-
-        log_info("Applying compensation from FCS matrix.")
-        comp = sample.apply_compensation()
-        return comp, sample.channels
-
-    if source == "file":
-        path = comp_cfg.get("path")
-        if not path:
-            raise ValueError("Compensation source 'file' requires 'path'.")
-        log_info(f"Loading compensation matrix from {path}")
-
-        df_mat = pd.read_csv(path, index_col=0)
-        comp = sample.apply_compensation(matrix=df_mat.to_numpy())
-        return comp, df_mat.columns.to_list()
-
-    raise ValueError(f"Invalid compensation source: {source}")
-
 def _normalize_channel(ch):
     return ch.replace(" (SW-unmix)", "").strip()
 
@@ -100,180 +79,215 @@ def _strip_front_progressively(name):
 
 def _validate_channels(df, channels):
     """
-    Validates channel existence and returns Vec<Dimension>.
-    Rust-equivalent: fn validate_channels(...) -> Vec<Dimension>
+    Validates channel existence and returns the matching column names.
+    Rust-equivalent: fn validate_channels(...) -> Vec<String>
+
+    df: DataFrame, or any collection of channel names (e.g. {name → column})
     """
+    columns = df.columns if hasattr(df, "columns") else df
     dims = []
 
     for ch in channels:
         # 1) exact match
-        if ch in df.columns:
-            dims.append(Dimension(ch))
+        if ch in columns:
+            dims.append(ch)
             continue
 
         # 2) strip '(SW-unmix)' and retry
         ch2 = _normalize_channel(ch)
-        if ch2 in df.columns:
+        if ch2 in columns:
             print(f"[FACSForge] Channel normalized: '{ch}' -> '{ch2}'")
-            dims.append(Dimension(ch2))
+            dims.append(ch2)
             continue
         # 3. Progressive strip from front
         for candidate in _strip_front_progressively(ch2):
-            if candidate in df.columns:
+            if candidate in columns:
                 print(f"[FACSForge] Channel reduced: '{ch}' -> '{candidate}'")
-                dims.append(Dimension(candidate))
+                dims.append(candidate)
                 break
         else: #only runs if for did not break
             # 3) fail loudly and honestly
             raise RuntimeError(
                 f"Missing FCS channel: {ch}\n"
-                f"Available: {list(df.columns)}"
+                f"Available: {list(columns)}"
             )
 
     return dims
 
-def _apply_gate(df, gate_def, gate_name):
+def _points_in_polygon(x, y, vertices):
+    """
+    Boolean mask of the events (x, y) inside the polygon.
+    Same test as flowkit's PolygonGate (see _kernels.polygon_mask).
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    return polygon_mask(
+        np.ascontiguousarray(vertices[:, 0]),
+        np.ascontiguousarray(vertices[:, 1]),
+        np.ascontiguousarray(x, dtype=np.float64),
+        np.ascontiguousarray(y, dtype=np.float64),
+    )
+
+def _column_index(cols, channels):
+    """Resolve gate channels (see _validate_channels) to columns of X."""
+    return [cols[ch] for ch in _validate_channels(cols, channels)]
+
+def _apply_gate(X, cols, gate_def, gate_name, parent_mask):
     """
-    Executes a gate definition (polygon, rectangle, threshold).
+    Executes a gate definition (polygon, rectangle, threshold) on the
+    events of the parent population.
+
+    X:           events, n_events x n_channels (column-major)
+    cols:        { channel → column of X }
+    parent_mask: boolean mask of the parent population
+
+    Returns: boolean mask of the gated population
     """
     gtype = gate_def["type"]
-    df.columns = [c[1] if isinstance(c, tuple) else c for c in df.columns]
+    rows = np.flatnonzero(parent_mask)
 
     # ------------------------------------------------------------------
     # POLYGON GATE
     # ------------------------------------------------------------------
     if gtype == "polygon":
-        channels = gate_def["channels"]
-        dims = _validate_channels(df,channels)
-
-        vertices = gate_def["vertices"]
-
-        gate = PolygonGate(
-            gate_name=gate_name,
-            dimensions=dims,
-            vertices=vertices
-        )
-
-        mask = gate.apply(df)
-        return df[mask]
+        i, j = _column_index(cols, gate_def["channels"])
+        hit = _points_in_polygon(X[rows, i], X[rows, j], gate_def["vertices"])
 
     # ------------------------------------------------------------------
-    # RECTANGLE GATE
+    # RECTANGLE GATE  (min <= value < max, as flowkit's RectangleGate)
     # ------------------------------------------------------------------
-    if gtype == "rectangle":
-        channels = gate_def["channels"]
-        dims = _validate_channels(df, channels)
-        ch1, ch2 = channels
-
-        vertices = gate_def["vertices"]
-
-        g = RectangleGate(
-            gate_name=gate_name,
-            dimensions=dims,
-            x_min=min(v[0] for v in vertices),
-            x_max=max(v[0] for v in vertices),
-            y_min=min(v[1] for v in vertices),
-            y_max=max(v[1] for v in vertices),
-        )
+    elif gtype == "rectangle":
+        i, j = _column_index(cols, gate_def["channels"])
+
+        vertices = np.asarray(gate_def["vertices"], dtype=np.float64)
+        (x_min, y_min), (x_max, y_max) = vertices.min(axis=0), vertices.max(axis=0)
 
-        mask = g.gate(df)
-        return df[mask]
+        hit = rectangle_mask(X, rows, i, j, x_min, x_max, y_min, y_max)
 
     # ------------------------------------------------------------------
     # THRESHOLD GATE
     # ------------------------------------------------------------------
-    if gtype == "threshold":
-        ch = gate_def["channel"]
-        _validate_channels([ch])
+    elif gtype == "threshold":
+        (i,) = _column_index(cols, [gate_def["channel"]])
 
-        mn = gate_def.get("min", -np.inf)
-        mx = gate_def.get("max", np.inf)
+        # float64 scalars: a plain float would be rounded to float32 events
+        mn = np.float64(gate_def.get("min", -np.inf))
+        mx = np.float64(gate_def.get("max", np.inf))
 
-        mask = (df[ch] >= mn) & (df[ch] <= mx)
-        return df[mask]
+        values = X[rows, i]
+        hit = values >= mn
+        hit &= values <= mx
 
-    raise ValueError(f"Unknown gate type: {gtype}")
+    else:
+        raise ValueError(f"Unknown gate type: {gtype}")
+
+    mask = np.zeros_like(parent_mask)
+    mask[rows[hit]] = True
+    return mask
 
 
-def _apply_marker_rules(df, rules, thresholds):
+def _apply_marker_rules(X, cols, rules, thresholds, mask):
     """
-    Apply positive/negative marker rules on a DataFrame slice.
+    Apply positive/negative marker rules to a population mask.
+    Only the events still inside the population are compared, all rules
+    in one pass (see _kernels.marker_rules_mask).
+
+    Returns: boolean mask (mask itself if no rule applies)
     """
-    subset = df
+    idx, thr, above = [], [], []
+
+    # positives = marker > threshold, negatives = marker <= threshold
+    for key, is_positive in (("positive", True), ("negative", False)):
+        for m in rules.get(key, []):
+            if m not in thresholds:
+                log_warn(f" Marker '{m}' has no auto-threshold; skipping.")
+                continue
+            idx.append(cols[m])
+            thr.append(thresholds[m])
+            above.append(is_positive)
+
+    if not idx:
+        return mask
+
+    rows = np.flatnonzero(mask)
+    hit = marker_rules_mask(
+        X, rows,
+        np.array(idx, dtype=np.int64),
+        np.array(thr, dtype=np.float64),
+        np.array(above, dtype=np.bool_),
+    )
 
-    # positives = marker > threshold
-    for m in rules.get("positive", []):
-        if m not in thresholds:
-            log_warn(f" Marker '{m}' has no auto-threshold; skipping.")
-            continue
-        subset = subset[subset[m] > thresholds[m]]
+    out = np.zeros_like(mask)
+    out[rows[hit]] = True
+    return out
 
-    # negatives = marker <= threshold
-    for m in rules.get("negative", []):
-        if m not in thresholds:
-            log_warn(f" Marker '{m}' has no auto-threshold; skipping.")
-            continue
-        subset = subset[subset[m] <= thresholds[m]]
+def _gating_order(celltypes):
+    """
+    Order the celltypes so that every parent comes before its children
+    (breadth first from the root populations, in YAML order).
+    """
+    children = defaultdict(list)
+    order = []
+    for ct, cfg in celltypes.items():
+        parent = cfg.get("parent")
+        if parent is None:
+            order.append(ct)
+        else:
+            children[parent].append(ct)
 
-    return subset
+    queue = deque(order)
+    while queue:
+        kids = children.get(queue.popleft(), ())
+        order.extend(kids)
+        queue.extend(kids)
 
-def _apply_compensation(sample, experiment):
-    try:
-        return sample.get_events(), sample.channels
-    except AttributeError:
-        return sample.get_events(source="raw"), sample.channels
+    if len(order) < len(celltypes):
+        # missing parent or a parent cycle
+        unresolved = set(celltypes) - set(order)
+        raise RuntimeError(f"Could not resolve gating tree; unresolved: {unresolved}")
 
-def _run_gating_tree(df_raw, experiment):
+    return order
+
+def _run_gating_tree(X, cols, experiment, thresholds=None):
     """
     Execute hierarchical gating as defined in the YAML.
+    Every population is a boolean mask over the rows of X.
+
+    X:    events, n_events x n_channels (column-major)
+    cols: { channel → column of X }  (the channels used for gating)
+    thresholds: precomputed auto-thresholds (computed here if None)
 
     Returns:
-      dict(celltype_name → gated_df)
+      dict(celltype_name → boolean mask over the rows of X)
     """
     celltypes = experiment["celltypes"]
 
     # First compute thresholds for all markers
-    thresholds = compute_auto_thresholds(df_raw, experiment)
+    if thresholds is None:
+        thresholds = compute_auto_thresholds(X, cols, experiment)
     log_info(f"Computed thresholds for {len(thresholds)} markers.")
 
-    # Store gated subsets
-    gated = {}
-
-    # We loop until all nodes are processed
-    pending = set(celltypes.keys())
-    max_iters = len(pending) + 4
-
-    for _ in range(max_iters):
-        if not pending:
-            break
-
-        for ct in list(pending):
-            cfg = celltypes[ct]
-            parent = cfg.get("parent")
+    all_events = np.ones(X.shape[0], dtype=bool)
 
-            # determine parent dataframe
-            if parent is None:
-                df_parent = df_raw
-            else:
-                if parent not in gated:
-                    continue  # parent not ready yet
-                df_parent = gated[parent]
+    # Store gated populations
+    gated = {}
 
-            # apply geometric gate (if exists)
-            if "gate" in cfg:
-                gate_def = cfg["gate"]
-                df_stage = _apply_gate(df_parent, gate_def, ct)
-            else:
-                df_stage = df_parent
+    # parents are always gated before their children
+    for ct in _gating_order(celltypes):
+        cfg = celltypes[ct]
+        parent = cfg.get("parent")
+        parent_mask = all_events if parent is None else gated[parent]
 
-            # apply positive/negative rules
-            df_stage = _apply_marker_rules(df_stage, cfg, thresholds)
+        # apply geometric gate (if exists)
+        if "gate" in cfg:
+            gate_def = cfg["gate"]
+            mask = _apply_gate(X, cols, gate_def, ct, parent_mask)
+        else:
+            mask = parent_mask
 
-            gated[ct] = df_stage
-            pending.remove(ct)
+        # apply positive/negative rules
+        mask = _apply_marker_rules(X, cols, cfg, thresholds, mask)
 
-    if pending:
-        raise RuntimeError(f"Could not resolve gating tree; unresolved: {pending}")
+        gated[ct] = mask
 
     return gated
 
@@ -340,19 +354,113 @@ def _find_well_column(df):
 
 
 
+def _scaled_column(X, cols, ch, scaled):
+    """
+    Plot coordinates (xform: logicle for fluorescence) of channel ch for
+    all events. Computed once per channel and kept in the dict `scaled`;
+    NaN events stay NaN.
+    """
+    if ch not in scaled:
+        raw = X[:, cols[ch]]
+        values = xform(pd.Series(raw, name=ch)).to_numpy(dtype=float, copy=True)
+        values[np.isnan(raw)] = np.nan
+        scaled[ch] = values
+    return scaled[ch]
+
+# PNG text chunk holding the _plot_stamp of the data a plot was drawn from
+_PLOT_STAMP_KEY = "facsforge-stamp"
+
+def _compensation_key(experiment):
+    """
+    The compensation settings plus the content hash of a matrix file
+    (source 'file'): editing the matrix changes the events.
+    """
+    comp = experiment.get("compensation") or {}
+    digest = None
+    if comp.get("source") == "file" and comp.get("path"):
+        try:
+            digest = file_digest(comp["path"])
+        except OSError:
+            pass  # _load_events reports the missing matrix
+    return comp, digest
+
+def _plot_stamp(fcs_path, index_csv, experiment, name, parent_mask=None, mask=None):
+    """
+    Hash of everything the plot of population `name` depends on: the FCS
+    and index files, the compensation (including the matrix file), the
+    auto-threshold settings, the definitions of the population and all
+    its ancestors, and the parent / gated events actually drawn.
+    """
+    celltypes = experiment["celltypes"]
+    chain = []
+    ct = name
+    while ct is not None:
+        chain.append(celltypes[ct])
+        ct = celltypes[ct].get("parent")
+
+    data = repr((
+        CODE_VERSION,
+        file_digest(fcs_path),
+        file_digest(index_csv),
+        _compensation_key(experiment),
+        experiment["panel"],
+        experiment.get("ignore_markers"),
+        chain,
+    ))
+    h = hashlib.blake2b(data.encode(), digest_size=16)
+    for m in (parent_mask, mask):
+        h.update(b"-" if m is None else np.packbits(m).tobytes())
+    return h.hexdigest()
+
+def _png_stamp(path):
+    """The _plot_stamp stored in an existing plot, or None."""
+    try:
+        with Image.open(path) as im:
+            return im.info.get(_PLOT_STAMP_KEY)
+    except OSError:
+        return None
+
+# parents with more events are drawn as a density image instead of points
+_HIST_MIN_EVENTS = 100_000
+_HIST_BINS = 512
+
+def _plot_density(ax, x, y):
+    """
+    Draw a large event cloud as a (log) 2D histogram image: one image
+    instead of millions of markers for Agg to rasterize.
+    """
+    H, xe, ye = np.histogram2d(x, y, bins=_HIST_BINS)
+    ax.imshow(
+        np.log1p(H.T),
+        origin="lower",
+        extent=[xe[0], xe[-1], ye[0], ye[-1]],
+        cmap="Greys",
+        aspect="auto",
+        interpolation="nearest",
+        zorder=1,
+    )
+
 def _plot_nice_population(
-    parent_df,
-    sub_df,
+    X,
+    cols,
+    parent_mask,
+    mask,
     index_df,
     gate_def,
     name,
     outdir,
+    scaled=None,
+    stamp=None,
     density=False,
     logicle=True,
 ):
     """
     Matplotlib + logicle (biexponential) cytometry plotting.
     Produces FlowJo-like scaling with parent background + gated + index overlays.
+
+    parent_mask / mask: parent and gated population (boolean masks over X)
+    scaled: { channel → transformed events } shared between the plots
+    stamp:  see _plot_stamp; an existing plot with the same stamp is kept
     """
     # Global flags / handles
     
@@ -390,14 +498,10 @@ def _plot_nice_population(
         print(f"[FACSForge] Skipping plot for {name} — not a 2D gate.")
         return
 
-    ch1, ch2 = _validate_channels(parent_df, channels)
-    ch1 = ch1.id
-    ch2 = ch2.id
+    ch1, ch2 = _validate_channels(cols, channels)
 
     try:
         ch_idx_1, ch_idx_2 = _validate_channels(index_df, channels)
-        ch_idx_1 = ch_idx_1.id
-        ch_idx_2 = ch_idx_2.id
         index = index_df.dropna()
         well_col = _find_well_column(index)
         if well_col:
@@ -418,20 +522,24 @@ def _plot_nice_population(
     # ----------------------------------
     out_file = outdir / safe_filename(f"{name}_{ch1}_{ch2}.png")
 
+    if stamp is not None and _png_stamp(out_file) == stamp:
+        print(f"[FACSForge] Plot is up to date → {out_file}")
+        return
+
     # ----------------------------------
-    # Prepare data (drop invalid rows)
-    # ----------------------------------
-    parent = parent_df[[ch1, ch2]].dropna()
-    gated = sub_df[[ch1, ch2]].dropna()
-    
-    # ----------------------------------
-    # Apply transform
+    # Transformed events (drop invalid rows)
     # ----------------------------------
-    Xp = xform(parent[ch1]).values
-    Yp = xform(parent[ch2]).values
+    if scaled is None:
+        scaled = {}
+    sx = _scaled_column(X, cols, ch1, scaled)
+    sy = _scaled_column(X, cols, ch2, scaled)
+    valid = ~(np.isnan(sx) | np.isnan(sy))
 
-    Xg = xform(gated[ch1]).values
-    Yg = xform(gated[ch2]).values
+    parent = valid if parent_mask is None else parent_mask & valid
+    Xp, Yp = sx[parent], sy[parent]
+
+    gated = mask & valid
+    Xg, Yg = sx[gated], sy[gated]
 
     # --------------------------
     # APPLY TRANSFORM TO INDEX
@@ -457,6 +565,9 @@ def _plot_nice_population(
     fig, ax = plt.subplots(figsize=(6, 5))
 
     # Background (parent)
+    if len(Xp) > _HIST_MIN_EVENTS:
+        _plot_density(ax, Xp, Yp)
+        Xp = Yp = []  # legend entry only
     ax.scatter(
         Xp, Yp,
         s=3,
@@ -493,23 +604,25 @@ def _plot_nice_population(
     # Annotate wells at index positions
     # ----------------------------------
     if wells is not None:
+        label_style = dict(
+            fontsize=9,
+            weight="bold",
+            color="black",
+            ha="left",
+            va="bottom",
+            zorder=5,
+            bbox=dict(
+                boxstyle="round,pad=0.2",
+                facecolor="white",
+                alpha=0.75,
+                edgecolor="none"
+            ),
+            # data labels must not drive tight_layout: measuring every
+            # label there costs as much as drawing it on a full plate
+            in_layout=False,
+        )
         for x, y, w in zip(Xi, Yi, wells):
-            ax.text(
-                x, y,
-                w,
-                fontsize=9,
-                weight="bold",
-                color="black",
-                ha="left",
-                va="bottom",
-                zorder=5,
-                bbox=dict(
-                    boxstyle="round,pad=0.2",
-                    facecolor="white",
-                    alpha=0.75,
-                    edgecolor="none"
-                )
-            )
+            ax.text(x, y, w, **label_style)
 
     # ----------------------------------
     # Cosmetics
@@ -524,17 +637,144 @@ def _plot_nice_population(
 
     ax.legend(frameon=False)
     fig.tight_layout()
-    fig.savefig(out_file, dpi=200)
+    fig.savefig(
+        out_file, dpi=200,
+        metadata=None if stamp is None else {_PLOT_STAMP_KEY: stamp},
+    )
     plt.close(fig)
 
     print(f"[FACSForge] Wrote plot → {out_file}")
 
-def run_gating_pipeline(fcs_path, index_csv, experiment, outdir):
+def _event_matrix(events):
+    """
+    Column-major copy of the events for gating.
+
+    FCS events are mostly float32 or <= 24 bit integers: they are kept
+    as float32 (half the memory traffic in every gate) whenever that is
+    lossless, otherwise as float64.
+    """
+    X = np.asfortranarray(events, dtype=np.float32)
+    if X.dtype != events.dtype and not np.array_equal(X, events, equal_nan=True):
+        log_info("Events are not float32-exact; gating in float64.")
+        return np.asfortranarray(events, dtype=np.float64)
+    return X
+
+def _population_frame(X, cols, mask=None):
+    """
+    DataFrame of the events in mask (all events if None), columns cols.
+    Exported as float64, whatever the precision X is stored in.
+    """
+    idx = list(cols.values())
+    data = X[:, idx] if mask is None else X[np.ix_(mask, idx)]
+    return pd.DataFrame(data.astype(np.float64, copy=False), columns=list(cols))
+
+def _write_csv(df, dest):
+    """Write a gated population table (pyarrow if available, else pandas)."""
+    if pa is None:
+        df.to_csv(dest, index=False)
+        return
+    # pyarrow quotes every header field whatever the quoting style, so the
+    # header is written like pandas does and pyarrow writes the rows only
+    header = io.StringIO()
+    csv.writer(header, lineterminator="\n").writerow(df.columns)
+    options = pa_csv.WriteOptions(include_header=False, quoting_style="needed")
+    with open(dest, "wb") as f:
+        f.write(header.getvalue().encode())
+        pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), f, options)
+
+def _write_population(df, outdir, name, fmt="csv"):
+    """
+    Write a gated population to outdir/gated_<name>.csv,
+    or .parquet (zstd, needs pyarrow) with output format 'parquet'.
+    """
+    if fmt == "parquet":
+        dest = outdir / f"gated_{name}.parquet"
+        df.to_parquet(dest, index=False, compression="zstd")
+    else:
+        dest = outdir / f"gated_{name}.csv"
+        _write_csv(df, dest)
+    return dest
+
+def _compensate(events, channels, spill, origin):
+    """
+    Apply the spillover matrix spill (DataFrame, detector channels as
+    columns) to the matching columns of events, in place: one matrix
+    product (BLAS) with its inverse for all events.
+    """
+    missing = [ch for ch in spill.columns if ch not in channels]
+    if missing:
+        raise RuntimeError(
+            f"Compensation matrix {origin} has channels missing in the FCS file: {missing}"
+        )
+    idx = [channels.index(ch) for ch in spill.columns]
+
+    matrix = spill.to_numpy(dtype=np.float64)
+    events[:, idx] = events[:, idx] @ np.linalg.inv(matrix)
+    return events
+
+def _compensate_from_file(events, channels, path):
+    """Apply the spillover matrix stored in the CSV `path` (see _compensate)."""
+    return _compensate(events, channels, pd.read_csv(path, index_col=0), path)
+
+def _fcs_spillover(text):
+    """
+    Spillover matrix of the $SPILLOVER (or SPILL) keyword in the FCS
+    text segment text (flowio's lower case keys), None if there is none.
+    The keyword holds n, the n channel names, then the n x n values.
+    """
+    value = text.get("spillover") or text.get("spill")
+    if not value:
+        return None
+    fields = [f.strip() for f in value.split(",")]
+    n = int(fields[0])
+    labels = fields[1:n + 1]
+    values = np.array(fields[n + 1:], dtype=np.float64).reshape(n, n)
+    return pd.DataFrame(values, index=labels, columns=labels)
+
+def _load_events(fcs_path, experiment):
+    """
+    Read the compensated events and their channel names ($PnN).
+
+    The compensation source is 'none', 'file' (spillover matrix in a
+    CSV file) or 'fcs' (the matrix stored in the FCS file, the default).
+    """
+    comp_cfg = experiment.get("compensation", {})
+    source = comp_cfg.get("source", "fcs")
+    if source not in ("none", "file", "fcs"):
+        raise ValueError(f"Invalid compensation source: {source}")
+
+    fcs = FlowData(str(fcs_path))
+    events = fcs.as_array(preprocess=True)
+    channels = list(fcs.pnn_labels)
+
+    if source == "none":
+        log_info("No compensation applied (source: none).")
+        return events, channels
+
+    if source == "file":
+        path = comp_cfg.get("path")
+        if not path:
+            raise ValueError("Compensation source 'file' requires 'path'.")
+        log_info(f"Loading compensation matrix from {path}")
+        return _compensate_from_file(events, channels, path), channels
+
+    spill = _fcs_spillover(fcs.text)
+    if spill is None:
+        log_warn("FCS file does NOT contain a compensation matrix.")
+        return events, channels
+
+    log_info("Applying compensation from FCS matrix.")
+    return _compensate(events, channels, spill, fcs_path), channels
+
+def run_gating_pipeline(fcs_path, index_csv, experiment, outdir, use_cache=True):
     """
     Main entry point for the FACSForge gating engine.
     Produces:
-      - gated populations (CSV)
+      - gated populations (CSV, or Parquet with output: {format: parquet})
       - thresholds.json (future)
+
+    use_cache=False recomputes the auto-thresholds and redraws all plots
+    instead of reusing cached / up to date results.
     """
 
     outdir = Path(outdir)
@@ -544,33 +784,43 @@ def run_gating_pipeline(fcs_path, index_csv, experiment, outdir):
 
     # -------------------------------------------------------
     # 1. Load files (FCS + index)
+    # 2. Compensation
     # -------------------------------------------------------
     log_info(f"Loading FCS file: {fcs_path}")
-    sample = fk.Sample(str(fcs_path))
+    events, channels = _load_events(fcs_path, experiment)
     overlay = load_index_csv( index_csv )
 
-    # -------------------------------------------------------
-    # 2. Compensation
-    # -------------------------------------------------------
-    events, channels = _apply_compensation(sample, experiment)
-    df = pd.DataFrame(events, columns=channels)
+    # one column-major copy of the events; DataFrames are only built
+    # for the exported populations
+    X = _event_matrix(events)
 
     # -------------------------------------------------------
     # 3. Drop ignored markers
     # -------------------------------------------------------
-    df = prepare_markers(df, experiment)
+    keep = set(prepare_markers(channels, experiment))
+    cols = {ch: i for i, ch in enumerate(channels) if ch in keep}
 
     # -------------------------------------------------------
     # 4. Run hierarchical gating
     # -------------------------------------------------------
-    populations = _run_gating_tree(df, experiment)
+    # thresholds only depend on the FCS data, compensation (settings and
+    # matrix file contents) and panel
+    thresholds = cached_call(
+        "thresholds", fcs_path,
+        (_compensation_key(experiment), list(cols), experiment["panel"]),
+        lambda: compute_auto_thresholds(X, cols, experiment),
+        use_cache=use_cache,
+    )
+    masks = _run_gating_tree(X, cols, experiment, thresholds)
+    populations = {name: _population_frame(X, cols, mask) for name, mask in masks.items()}
+    scaled = {}  # plot coordinates per channel, shared by all plots
 
     # -------------------------------------------------------
     # 5. Export gated subsets + plots
     # -------------------------------------------------------
+    fmt = experiment.get("output", {}).get("format", "csv")
     for name, sub in populations.items():
-        dest = outdir / f"gated_{name}.csv"
-        sub.to_csv(dest, index=False)
+        dest = _write_population(sub, outdir, name, fmt)
         log_info(f"Wrote {len(sub)} events → {dest}")
 
         # Look up gate definition
@@ -578,18 +828,24 @@ def run_gating_pipeline(fcs_path, index_csv, experiment, outdir):
         if gate_def is None:
             continue
 
-        # Identify parent population (if any)
-        parent_name = gate_def.get("parent")
-        parent_df = populations.get(parent_name, df)
+        # Identify parent population (None: all events)
+        parent_mask = masks.get(gate_def.get("parent"))
 
         # Call overlay plotter
         _plot_nice_population(
-            parent_df=parent_df,
-            sub_df=sub,
+            X, cols,
+            parent_mask=parent_mask,
+            mask=masks[name],
             index_df=overlay,
             gate_def=gate_def,
             name=name,
-            outdir=outdir
+            outdir=outdir,
+            scaled=scaled,
+            # unchanged plots from an earlier run are not redrawn
+            stamp=_plot_stamp(
+                fcs_path, index_csv, experiment, name,
+                parent_mask=parent_mask, mask=masks[name],
+            ) if use_cache else None,
         )
 
         log_info(f"Wrote overlay plot for {name} → {outdir}")
@@ -1,12 +1,21 @@
 #index.py
 
+import mmap
+import os
 import pandas as pd
 import numpy as np
 import re
-from facsforge.core.pita import get_logicle, xform, scale_info
+from facsforge.core.pita import get_logicle, xform_frame
 
 from pathlib import Path
 
+# Arrow's multithreaded parser is much faster on the wide index tables
+try:
+    import pyarrow
+    _CSV_ENGINE = "pyarrow"
+except ImportError:
+    _CSV_ENGINE = "c"
+
 def detect_event_column(df):
     candidates = [c for c in df.columns if re.match(r"event|event[_ ]?id|index", c.lower())]
     if not candidates:
@@ -14,6 +23,36 @@ def detect_event_column(df):
     return candidates[0]
 
 
+def _find_header(path, prefix):
+    """
+    Byte offset of the first line starting with `prefix` (bytes), or None.
+    The file is searched with mmap, without splitting it into lines.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:len(prefix)] == prefix:
+                return 0
+            pos = mm.find(b"\n" + prefix)
+            return pos + 1 if pos >= 0 else None
+
+
+def _dedup_columns(columns):
+    """'Time', 'Time' → 'Time', 'Time.1' (pandas' default parser mangling)"""
+    counts = {}
+    names = []
+    for col in columns:
+        n = counts.get(col, 0)
+        while n > 0:
+            counts[col] = n + 1
+            col = f"{col}.{n}"
+            n = counts.get(col, 0)
+        names.append(col)
+        counts[col] = n + 1
+    return names
+
+
 def load_index_csv(path):
     """
     Load a BD S8 index CSV.
@@ -23,18 +62,17 @@ def load_index_csv(path):
 
 
     # Detect header line
-    header_line = None
-    with open(path, "r") as f:
-        for i, line in enumerate(f):
-            if line.startswith("Well,"):
-                header_line = i
-                break
-
-    if header_line is None:
+    header = _find_header(path, b"Well,")
+
+    if header is None:
         raise ValueError(f"Could not find BD S8 header ('Well,') in {path}")
 
     # Read CSV starting from the header line
-    df = pd.read_csv(path, skiprows=header_line)
+    with open(path, "rb") as f:
+        f.seek(header)
+        df = pd.read_csv(f, engine=_CSV_ENGINE)
+    # BD writes some columns twice (Time); name them as the C parser would
+    df.columns = _dedup_columns(df.columns)
 
     # Normalize column names: remove spaces
     #df.columns = [c.strip().replace(" ", "") for c in df.columns]
@@ -57,7 +95,8 @@ def load_index_csv(path):
 
     # Remove empty rows (BD S8 writes zeros for missed wells)
     numeric = df.select_dtypes(include=[np.number]).columns
-    zero_mask = (df[numeric].fillna(0) == 0).all(axis=1)
+    values = df[numeric].to_numpy(dtype=np.float64, na_value=0.0)
+    zero_mask = ~values.any(axis=1)
     removed = zero_mask.sum()
     df = df.loc[~zero_mask].copy()
 
@@ -96,26 +135,10 @@ def load_all_sorted_csvs(csv_paths):
     if not _HAS_LOGICLE:
         return all_cells
 
-    scaled_count = 0
-
-    for col in list(all_cells.columns):  # list() to avoid mutating during iter
-        try:
-            s = all_cells[col]
-
-            do_scale, new_name = scale_info(col)
-
-            if not do_scale:
-                continue
-
-            # apply transform (returns pd.Series)
-            scaled_series = xform(s, col)
-
-            # rename + add column
-            all_cells[scaled_series.name] = scaled_series
-            scaled_count += 1
-
-        except Exception as e:
-            print(f"[WARN] Skipping column '{col}': {e}")
+    # all fluorescence channels in one logicle call
+    scaled = xform_frame(all_cells.select_dtypes(include=[np.number]))
+    scaled_count = scaled.shape[1]
+    all_cells = pd.concat([all_cells, scaled], axis=1)
 
     print(f"[FACSForge] Added {scaled_count} scaled channels (raw preserved)")
 
@@ -1,8 +1,11 @@
-import yaml
-import json
-from jsonschema import validate, Draft202012Validator
+import functools
+from jsonschema import Draft202012Validator
 from pathlib import Path
 
+from facsforge.utils.cache import cached_by_file
+from facsforge.utils.json_io import load_json
+from facsforge.utils.yaml_io import load_yaml
+
 class FACSForgeConfigError(Exception):
     """Raised when the experiment config is invalid."""
     pass
@@ -66,14 +69,15 @@ def enrich_panel_with_missing_channels(panel_dict, df_columns):
 
     return panel
 
+@functools.lru_cache(maxsize=1)
 def _load_schema():
     """
-    Loads the JSON schema from facsforge/config/schema.json.
+    Loads the JSON schema from facsforge/config/schema.json (once).
     """
     schema_path = Path(__file__).resolve().parent.parent / "config" / "schema.json"
     if not schema_path.exists():
         raise FACSForgeConfigError(f"Schema file not found: {schema_path}")
-    return json.loads(schema_path.read_text())
+    return load_json(schema_path)
 
 
 def _pretty_schema_error(error):
@@ -89,14 +93,25 @@ def _pretty_schema_error(error):
     )
 
 
-def _validate_schema(data, schema):
+@functools.lru_cache(maxsize=1)
+def _validator():
+    """The schema is checked and compiled into a validator only once."""
+    schema = _load_schema()
+    Draft202012Validator.check_schema(schema)
+    return Draft202012Validator(schema)
+
+
+def _validate_schema(data):
     """
     Performs JSON Schema validation using the Draft 2020-12 validator.
     Raises descriptive error messages.
     """
-    validator = Draft202012Validator(schema)
-
-    errors = sorted(validator.iter_errors(data), key=lambda e: e.path)
+    validator = _validator()
+    # is_valid stops at the first error; only a bad config pays for
+    # collecting and ordering all of them
+    if validator.is_valid(data):
+        return
+    errors = sorted(validator.iter_errors(data), key=lambda e: tuple(e.absolute_path))
     if errors:
         msg = "\n\n".join(_pretty_schema_error(err) for err in errors)
         raise FACSForgeConfigError(f"Configuration does not match schema:\n\n{msg}")
@@ -107,7 +122,6 @@ def _validate_parents(data):
     Ensures that all 'parent' references in celltypes exist.
     """
     celltypes = data.get("celltypes", {})
-    valid_parents = set(celltypes.keys()) | {None}
 
     for ct_name, ct_def in celltypes.items():
         parent = ct_def.get("parent")
@@ -120,19 +134,29 @@ def _validate_parents(data):
             )
 
 
-def _validate_panel(data):
+def _validate_panel_semantics(data):
     """
-    Ensures that panel channel names are unique.
+    Ensures that the panel is a mapping of channel names
+    (unique as keys of that mapping) and that each fluorochrome is used
+    at most once, in a single pass over the panel.
+    Biological constraint:
+      Two antibodies using the same fluor are generally invalid.
     """
     panel = data.get("panel", {})
     if not isinstance(panel, dict):
         raise FACSForgeConfigError("❌ 'panel' must be a mapping of channel names → metadata.")
 
-    seen = set()
-    for channel in panel:
-        if channel in seen:
-            raise FACSForgeConfigError(f"❌ Duplicate panel channel found: {channel}")
-        seen.add(channel)
+    used = {}
+    for channel, cfg in panel.items():
+        fluor = cfg.get("fluor")
+        if fluor is None:
+            continue
+        first = used.setdefault(fluor, channel)
+        if first != channel:
+            raise FACSForgeConfigError(
+                f"❌ Duplicate fluorochrome detected: '{fluor}' is used by both "
+                f"'{first}' and '{channel}'."
+            )
 
 
 def _validate_celltypes(data):
@@ -149,37 +173,19 @@ def _validate_celltypes(data):
                 f"❌ Celltype '{name}' must have a dictionary as its definition."
             )
 
-def _validate_fluorochromes(data):
-    """
-    Ensures that each fluorochrome is used at most once.
-    Biological constraint:
-      Two antibodies using the same fluor are generally invalid.
-    """
-    panel = data.get("panel", {})
-    used = {}
-
-    for channel, cfg in panel.items():
-        fluor = cfg.get("fluor")
-        if fluor is None:
-            continue
-        if fluor in used:
-            raise FACSForgeConfigError(
-                f"❌ Duplicate fluorochrome detected: '{fluor}' is used by both "
-                f"'{used[fluor]}' and '{channel}'."
-            )
-        used[fluor] = channel
-
-
+@cached_by_file("experiment")
 def load_experiment(config_path):
     """
     Loads and fully validates an experiment YAML file.
+    Valid configs are cached on disk by file content, so repeated runs on
+    the same YAML skip parsing and validation (pass use_cache=False to
+    force both).
 
     Performs:
       - YAML parsing
       - JSON schema validation
       - parent consistency checks
-      - duplicate channel checks
-      - duplicate celltype checks
+      - duplicate fluorochrome checks
 
     Returns:
         dict: validated configuration data
@@ -191,27 +197,23 @@ def load_experiment(config_path):
 
     # ----- Load YAML -----
     try:
-        with open(config_path, "r") as f:
-            data = yaml.safe_load(f)
+        with open(config_path, "rb") as f:
+            data = load_yaml(f)
     except Exception as e:
         raise FACSForgeConfigError(f"❌ Failed to parse YAML file:\n{e}")
 
-    # ----- Load JSON Schema -----
-    schema = _load_schema()
-
     for name, cell in data["celltypes"].items():
         g = cell.get("gate", {})
         if isinstance(g.get("min"), list) or isinstance(g.get("max"), list):
             print("🚨 BAD GATE:", name, g)
 
     # ----- Validate against schema -----
-    _validate_schema(data, schema)
+    _validate_schema(data)
 
     # ----- Additional semantic validation -----
-    _validate_panel(data)
+    _validate_panel_semantics(data)
     _validate_celltypes(data)
     _validate_parents(data)
-    _validate_fluorochromes(data)
 
     return data
 
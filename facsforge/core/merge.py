@@ -1,22 +1,33 @@
 import os
-import yaml
+from facsforge.utils.yaml_io import load_yaml
 
 def merge_configs(base, new):
     """
     Merge two FACSForge YAML dictionaries.
     Values from 'new' override or fill missing entries in 'base'.
+    Neither input is modified.
     """
-    result = dict(base)
+    # panel is merged separately (top level only)
+    rest = {key: value for key, value in new.items() if key != "panel"}
+    result = _merge_into(dict(base), rest)
 
-    for key, value in new.items():
+    result["panel"] = merge_panels(
+        result.get("panel", {}),
+        new.get("panel", {})
+    )
+    return result
 
-        # Skip panel here — handled separately
-        if key == "panel":
-            continue
+def _merge_into(result, new):
+    """
+    Merge 'new' into the dict 'result' in place and return it.
+    Only nested dicts present in both are copied (they belong to the
+    caller's base); everything else is assigned without copying.
+    """
+    for key, value in new.items():
 
         # Nested dict: merge recursively
         if key in result and isinstance(result[key], dict) and isinstance(value, dict):
-            result[key] = merge_configs(result[key], value)
+            result[key] = _merge_into(dict(result[key]), value)
             continue
 
         # Arrays: extend only if new array is non-empty
@@ -28,17 +39,14 @@ def merge_configs(base, new):
         # scalars: override if new value is not None
         if value is not None:
             result[key] = value
-    
-    result["panel"] = merge_panels(
-        result.get("panel", {}),
-        new.get("panel", {})
-    )
+
     return result
 
 def load_existing_yaml(path):
+    """Parse an existing FACSForge YAML (empty dict if there is none)."""
     if os.path.exists(path):
-        with open(path, "r") as f:
-            return yaml.safe_load(f) or {}
+        with open(path, "rb") as f:
+            return load_yaml(f) or {}
     return {}
 
 def merge_panels(base_panel, new_panel):
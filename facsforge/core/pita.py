@@ -1,15 +1,36 @@
 # facsforge/core/pita.py
+import functools
+import numpy as np
 import pandas as pd
 import re
 
 _HAS_LOGICLE = False
 _logicle = None
+_logicle_vec = None     # x → logicle(x), calling convention resolved once
+_initialized = False
+
+# logicle parameters T, W, M, A
+_LOGICLE_PARAMS = (262144.0, 0.5, 4.5, 0.0)
+
+
+def _vectorized(fn):
+    """
+    flowutils versions disagree on the argument order; find out once
+    with a dummy array which one this fn uses.
+    """
+    try:
+        fn(*_LOGICLE_PARAMS, np.zeros(1))
+        return lambda x: fn(*_LOGICLE_PARAMS, x)
+    except TypeError:
+        return lambda x: fn(x, *_LOGICLE_PARAMS)
+
 
 def init_logicle():
-    global _HAS_LOGICLE, _logicle
+    global _HAS_LOGICLE, _logicle, _logicle_vec, _initialized
 
-    if _logicle is not None:
+    if _initialized:
         return _HAS_LOGICLE, _logicle   # already initialized
+    _initialized = True
 
     try:
         from flowutils import logicle_c as mod
@@ -23,12 +44,13 @@ def init_logicle():
         else:
             raise ImportError("flowutils.logicle_c has no usable function")
 
+        _logicle_vec = _vectorized(_logicle)
         _HAS_LOGICLE = True
         print("[FACSForge] Logicle loaded")   # optional
 
     except Exception as e:
         _HAS_LOGICLE = False
-        _logicle = None
+        _logicle = _logicle_vec = None
         print(f"[FACSForge] Logicle unavailable → linear only: {e}")
 
     return _HAS_LOGICLE, _logicle
@@ -39,7 +61,7 @@ def get_logicle():
     Returns (has_logicle, logicle_function)
     Guaranteed to initialize once.
     """
-    if _logicle is None:
+    if not _initialized:
         init_logicle()
     return _HAS_LOGICLE, _logicle
 
@@ -47,26 +69,43 @@ def get_logicle():
 # ----------------------------------
 # Transform helper
 # ----------------------------------
+def logicle_array(x):
+    """
+    Logicle transform of a float array of any shape, in a single call
+    into flowutils. Requires logicle (see get_logicle).
+    """
+    get_logicle()
+    x = np.ascontiguousarray(x, dtype=float)
+    return np.asarray(_logicle_vec(x.reshape(-1))).reshape(x.shape)
+
+def xform_frame(df: pd.DataFrame):
+    """
+    Logicle-transformed copies ('<name> (scaled)') of all fluorescence
+    columns of df, computed in one call. Empty without logicle.
+    """
+    _HAS_LOGICLE, _ = get_logicle()
+    cols = [c for c in df.columns if scale_info(c)[0]] if _HAS_LOGICLE else []
+    if not cols:
+        return pd.DataFrame(index=df.index)
+
+    values = df[cols].to_numpy(dtype=np.float64, na_value=np.nan)
+    return pd.DataFrame(
+        logicle_array(values),
+        columns=[scale_info(c)[1] for c in cols],
+        index=df.index,
+    )
+
 def xform(s: pd.Series):
     _HAS_LOGICLE, _logicle = get_logicle()
     if not _HAS_LOGICLE:
         return s
 
-    x = s.to_numpy(dtype=float)
     do_scale, label = scale_info(s.name)
 
     if not (_logicle and _HAS_LOGICLE and do_scale):
         return s
 
-    T = 262144.0
-    W = 0.5
-    M = 4.5
-    A = 0.0
-
-    try:
-        y = _logicle(T, W, M, A, x)
-    except TypeError:
-        y = _logicle(x, T, W, M, A)
+    y = logicle_array(s.to_numpy(dtype=float))
 
     return pd.Series(y, index=s.index, name=label)
 
@@ -81,6 +120,7 @@ _SCATTER_RE = re.compile(
     re.IGNORECASE | re.VERBOSE,
 )
 
+@functools.lru_cache(maxsize=None)
 def scale_info(name: str):
     if _SCATTER_RE.search(name) is not None:
         return False, name         # scatter → linear
@@ -1,25 +1,41 @@
 import numpy as np
 
-def _compute_threshold(values):
+from facsforge.core._kernels import column_histograms
+
+_BINS = 200
+
+
+def _valley_threshold(hist, bins, values):
     """
-    Compute auto threshold by valley finding.
+    Auto threshold from a histogram: the left edge of the first bin below
+    the 20th percentile of the counts (95th percentile of values if none).
     """
-    hist, bins = np.histogram(values, bins=200)
     cutoff = np.percentile(hist, 20)
     idxs = np.where(hist < cutoff)[0]
     if len(idxs) == 0:
-        return np.percentile(values, 95)
+        return np.percentile(values(), 95)
     return bins[idxs[0]]
 
 
-def compute_auto_thresholds(df, experiment):
+def _compute_threshold(values):
+    """
+    Compute auto threshold by valley finding.
+    """
+    hist, bins = np.histogram(values, bins=_BINS)
+    return _valley_threshold(hist, bins, lambda: values)
+
+
+def compute_auto_thresholds(X, cols, experiment):
     """
     Compute thresholds for all marker channels (except ignored ones).
+
+    X:    events, n_events x n_channels
+    cols: { channel → column of X }
     """
     panel = experiment["panel"]
 
-    thresholds = {}
-    for marker in df.columns:
+    markers = {}
+    for marker, i in cols.items():
         pinfo = panel.get(marker)
         if pinfo is None:
             continue
@@ -28,8 +44,20 @@ def compute_auto_thresholds(df, experiment):
         # FSC/SSC typically should not get auto thresholds
         if marker.startswith("FSC") or marker.startswith("SSC"):
             continue
+        markers[marker] = i
 
-        thresholds[marker] = _compute_threshold(df[marker])
+    if not markers:
+        return {}
 
-    return thresholds
+    # the histograms of all markers in one pass (float64 bins, also for
+    # float32 events)
+    idx = np.fromiter(markers.values(), dtype=np.int64, count=len(markers))
+    hists, edges = column_histograms(X, idx, _BINS)
+
+    thresholds = {}
+    for k, (marker, i) in enumerate(markers.items()):
+        thresholds[marker] = _valley_threshold(
+            hists[k], edges[k], lambda: X[:, i].astype(np.float64)
+        )
 
+    return thresholds
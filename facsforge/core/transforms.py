@@ -1,7 +1,9 @@
-def prepare_markers(df, experiment):
+def prepare_markers(channels, experiment):
     """
-    Removes ignored markers from the DataFrame.
+    Removes ignored markers.
+
+    Returns: the channel names to keep (in order)
     """
     panel = experiment["panel"]
-    cols = [c for c in df.columns if not panel.get(c, {}).get("ignore", False)]
-    return df[cols]
+    ignored = {c for c, cfg in panel.items() if cfg.get("ignore", False)}
+    return [c for c in channels if c not in ignored]
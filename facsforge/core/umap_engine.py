@@ -1,4 +1,3 @@
-from umap import UMAP
 import pandas as pd
 import numpy as np
 
@@ -7,34 +6,44 @@ def run_umap(populations, experiment):
     if not umap_cfg.get("enabled", False):
         return None
 
+    # umap pulls in numba, pynndescent and scikit-learn; only pay for
+    # that when an embedding is actually requested
+    from umap import UMAP
+
     # collect populations
     celltypes = umap_cfg.get("celltypes", "auto")
     if celltypes == "auto":
         celltypes = experiment.get("celltypes_of_interest", [])
 
-    dfs = []
-    for name in celltypes:
-        if name not in populations:
-            continue
-        df = populations[name].copy()
-        df["celltype"] = name
-        dfs.append(df)
-
-    df_all = pd.concat(dfs, axis=0)
+    # unique names: they become the categories of the celltype column
+    celltypes = [name for name in dict.fromkeys(celltypes) if name in populations]
+    frames = [populations[name] for name in celltypes]
 
     # choose markers
     markers = umap_cfg.get("markers", "auto")
     if markers == "auto":
         panel = experiment["panel"]
-        markers = [m for m, cfg in panel.items() if not cfg.get("ignore")]
-        markers = [m for m in markers if m in df_all.columns]
-
-    X = df_all[markers].to_numpy()
+        markers = [
+            m for m, cfg in panel.items()
+            if not cfg.get("ignore") and all(m in df.columns for df in frames)
+        ]
+
+    # one pre-sized float32 matrix (the dtype UMAP works in) and a code
+    # per event instead of concatenated frames with a string column
+    sizes = [len(df) for df in frames]
+    X = np.empty((sum(sizes), len(markers)), dtype=np.float32)
+    codes = np.repeat(np.arange(len(frames), dtype=np.int32), sizes)
+    start = 0
+    for df, n in zip(frames, sizes):
+        X[start:start + n] = df[markers].to_numpy(dtype=np.float32, copy=False)
+        start += n
 
     reducer = UMAP(
         n_neighbors=umap_cfg.get("neighbors", 30),
         min_dist=umap_cfg.get("min_dist", 0.2),
-        metric=umap_cfg.get("metric", "euclidean")
+        metric=umap_cfg.get("metric", "euclidean"),
+        n_jobs=-1,
+        low_memory=True,
     )
 
     emb = reducer.fit_transform(X)
@@ -42,7 +51,7 @@ def run_umap(populations, experiment):
     df_umap = pd.DataFrame({
         "UMAP1": emb[:, 0],
         "UMAP2": emb[:, 1],
-        "celltype": df_all["celltype"].values
+        "celltype": pd.Categorical.from_codes(codes, celltypes)
     })
 
     return df_umap
@@ -1,33 +1,38 @@
-import json
-import jsonschema
+import functools
 import os
+from jsonschema import Draft202012Validator
+from jsonschema.exceptions import best_match
 
-def load_schema():
-    here = os.path.dirname(__file__)
-    schema_path = os.path.join(here, "..", "config", "schema.json")
-    with open(schema_path, "r") as f:
-        return json.load(f)
+from facsforge.utils.json_io import load_json
 
 # Absolute, explicit, direct load of facsforge/config/schema.json
-SCHEMA_PATH = os.path.join(
+SCHEMA_PATH = os.path.abspath(os.path.join(
     os.path.dirname(__file__),   # facsforge/core/
     "..",
     "config",
     "schema.json"
-)
+))
 
-SCHEMA_PATH = os.path.abspath(SCHEMA_PATH)
 
-if not os.path.exists(SCHEMA_PATH):
-    raise RuntimeError(
-        f"FATAL ERROR: Could not find FACSForge schema at:\n  {SCHEMA_PATH}"
-    )
+@functools.lru_cache(maxsize=None)
+def load_schema():
+    """Read the schema on first use (no disk I/O at import time)."""
+    if not os.path.exists(SCHEMA_PATH):
+        raise RuntimeError(
+            f"FATAL ERROR: Could not find FACSForge schema at:\n  {SCHEMA_PATH}"
+        )
+    return load_json(SCHEMA_PATH)
 
-with open(SCHEMA_PATH, "r") as f:
-    SCHEMA = json.load(f)
+@functools.lru_cache(maxsize=None)
+def _validator():
+    """The schema is checked and compiled into a validator only once."""
+    schema = load_schema()
+    Draft202012Validator.check_schema(schema)
+    return Draft202012Validator(schema)
 
 def validate_config(cfg):
-    try:
-        jsonschema.validate(cfg, SCHEMA)
-    except jsonschema.ValidationError as e:
+    # same error jsonschema.validate() would raise, without re-checking
+    # the schema and building a new validator on every call
+    e = best_match(_validator().iter_errors(cfg))
+    if e is not None:
         raise RuntimeError(f"FACSForge YAML does not match schema:\n{e}")
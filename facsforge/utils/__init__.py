@@ -1 +1,2 @@
-from .gatingml_parser import parse_gatingml_gate
\ No newline at end of file
+from .gatingml_parser import parse_gatingml_gate
+from .workspace_parser import scan_workspace
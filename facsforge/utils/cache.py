@@ -0,0 +1,195 @@
+"""
+Small on-disk cache for expensive, deterministic results
+(parsed FlowJo workspaces, ...).
+
+Entries live under $XDG_CACHE_HOME/facsforge/<CODE_VERSION> (default
+~/.cache/facsforge), CODE_VERSION being the package version and a hash of
+the facsforge sources and schema, and are keyed by a content hash of the
+input file, so editing the input or changing the code invalidates them.
+The entries of other code versions are deleted when a new one is written.
+"""
+
+import functools
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+
+from facsforge.utils.logging import log_info, log_warn
+
+try:
+    from importlib.metadata import version as _pkg_version
+    FACSFORGE_VERSION = _pkg_version("facsforge")
+except Exception:
+    FACSFORGE_VERSION = "unknown"
+
+
+def _code_hash():
+    """Hash of the facsforge sources (*.py) and the config schema."""
+    pkg = Path(__file__).resolve().parent.parent
+    h = hashlib.blake2b(digest_size=8)
+    for path in sorted([*pkg.rglob("*.py"), pkg / "config" / "schema.json"]):
+        h.update(path.relative_to(pkg).as_posix().encode())
+        try:
+            h.update(path.read_bytes())
+        except OSError:
+            pass
+    return h.hexdigest()
+
+
+# the package version alone stays "0.1.0" across code fixes
+CODE_VERSION = f"{FACSFORGE_VERSION}+{_code_hash()}"
+
+_MISS = object()
+
+# cache roots already cleared of other code versions by this process
+_PRUNED = set()
+
+
+def cache_dir():
+    """Root directory of the facsforge cache."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(Path.home(), ".cache")
+    return Path(base) / "facsforge"
+
+
+def _version_dir():
+    """Directory of the cache entries written by this CODE_VERSION."""
+    return cache_dir() / CODE_VERSION
+
+
+def _prune_other_versions():
+    """
+    Delete the entries of all other code versions (once per process):
+    they can never be hit again and would pile up with every code change.
+    """
+    root = cache_dir()
+    if root in _PRUNED:
+        return
+    _PRUNED.add(root)
+
+    current = _version_dir()
+    for d in root.iterdir():
+        # digests/ maps file paths to content hashes, whatever the code
+        if d.is_dir() and d != current and d.name != "digests":
+            shutil.rmtree(d, ignore_errors=True)
+
+
+def _hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def file_digest(path):
+    """
+    Content hash of a file.
+
+    The (mtime, size) of the last hashed version is remembered, so an
+    unchanged file is not read again.
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    stamp = f"{st.st_mtime_ns} {st.st_size}"
+
+    index = cache_dir() / "digests" / (_hash(path.encode()) + ".txt")
+    try:
+        known_stamp, digest = index.read_text().rsplit(" ", 1)
+        if known_stamp == stamp:
+            return digest
+    except (OSError, ValueError):
+        pass
+
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    digest = h.hexdigest()
+
+    try:
+        _atomic_write(index, f"{stamp} {digest}".encode())
+    except OSError:
+        pass
+    return digest
+
+
+def _atomic_write(dest, data):
+    """Write bytes to dest via a temp file + os.replace (no torn files)."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=dest.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, dest)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _load(entry):
+    try:
+        with open(entry, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return _MISS
+    except Exception as e:
+        log_warn(f"Ignoring unreadable cache entry {entry}: {e}")
+        return _MISS
+
+
+def _store(entry, value):
+    try:
+        _atomic_write(entry, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except OSError as e:
+        log_warn(f"Could not write cache entry {entry}: {e}")
+        return
+    _prune_other_versions()
+
+
+def cached_call(namespace, path, key, compute, use_cache=True):
+    """
+    Return compute(), cached on disk by the content of `path`, `key`
+    (a repr-able description of all other inputs) and CODE_VERSION.
+    """
+    if not use_cache:
+        return compute()
+
+    try:
+        digest = file_digest(path)
+    except OSError:
+        # let compute() report missing/unreadable input
+        return compute()
+
+    entry = _version_dir() / namespace / (
+        _hash(f"{digest}|{key!r}".encode()) + ".pkl"
+    )
+
+    result = _load(entry)
+    if result is not _MISS:
+        log_info(f"Using cached {namespace} result for {path}")
+        return result
+
+    result = compute()
+    _store(entry, result)
+    return result
+
+
+def cached_by_file(namespace):
+    """
+    Decorator: cache func(path, *args, **kwargs) on disk, keyed by the
+    content of `path`, the remaining arguments and CODE_VERSION.
+
+    The wrapped function takes an extra keyword `use_cache=True`;
+    use_cache=False always recomputes (and does not touch the cache).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(path, *args, use_cache=True, **kwargs):
+            return cached_call(
+                namespace, path,
+                f"{args!r}|{sorted(kwargs.items())!r}",
+                lambda: func(path, *args, **kwargs),
+                use_cache=use_cache,
+            )
+
+        return wrapper
+    return decorator
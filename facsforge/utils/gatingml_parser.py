@@ -1,9 +1,21 @@
-import xml.etree.ElementTree as ET
+from lxml import etree
 
 # Namespaces for Gating-ML v2.0
 NS_G = "{http://www.isac-net.org/std/Gating-ML/v2.0/gating}"
 NS_D = "{http://www.isac-net.org/std/Gating-ML/v2.0/datatypes}"
 
+# Namespaced tag / attribute names, built once instead of per element
+_POLYGON_TAG = f"{NS_G}PolygonGate"
+_RECTANGLE_TAG = f"{NS_G}RectangleGate"
+_DIM_TAG = f"{NS_G}dimension"
+_VERTEX_TAG = f"{NS_G}vertex"
+_COORD_TAG = f"{NS_G}coordinate"
+_FCS_DIM_TAG = f"{NS_D}fcs-dimension"
+_VALUE_ATTR = f"{NS_D}value"
+_NAME_ATTR = f"{NS_D}name"
+_MIN_ATTR = f"{NS_G}min"
+_MAX_ATTR = f"{NS_G}max"
+
 
 # =====================================================================
 # Helpers
@@ -12,7 +24,7 @@ NS_D = "{http://www.isac-net.org/std/Gating-ML/v2.0/datatypes}"
 def _get_value(coord_el):
     """Extract numeric value from <coordinate ns1:value="...">."""
     return float(
-        coord_el.get(f"{NS_D}value") or
+        coord_el.get(_VALUE_ATTR) or
         coord_el.get("value")
     )
 
@@ -24,12 +36,12 @@ def _get_dim_name(dim_el):
         <ns1:fcs-dimension ns1:name="FSC-A"/>
     </ns0:dimension>
     """
-    fcs_dim = dim_el.find(f"{NS_D}fcs-dimension")
+    fcs_dim = dim_el.find(_FCS_DIM_TAG)
     if fcs_dim is None:
         return None
 
     return (
-        fcs_dim.get(f"{NS_D}name") or
+        fcs_dim.get(_NAME_ATTR) or
         fcs_dim.get("name")
     )
 
@@ -54,15 +66,15 @@ def parse_polygon_gate(poly_el):
 
     # -------- channels --------
     channels = []
-    for dim in poly_el.findall(f"{NS_G}dimension"):
+    for dim in poly_el.findall(_DIM_TAG):
         name = _get_dim_name(dim)
         if name:
             channels.append(name)
 
     # -------- vertices --------
     vertices = []
-    for v in poly_el.findall(f"{NS_G}vertex"):
-        coords = v.findall(f"{NS_G}coordinate")
+    for v in poly_el.findall(_VERTEX_TAG):
+        coords = v.findall(_COORD_TAG)
         if len(coords) != 2:
             continue
         x = _get_value(coords[0])
@@ -81,7 +93,7 @@ def parse_polygon_gate(poly_el):
 # =====================================================================
 
 def parse_rectangle_gate(rect_el):
-    dims = rect_el.findall(f"{NS_G}dimension")
+    dims = rect_el.findall(_DIM_TAG)
     if len(dims) != 2:
         print("WARNING: RectangleGate has !=2 dimensions")
         return None
@@ -91,10 +103,10 @@ def parse_rectangle_gate(rect_el):
     ch_y = _get_dim_name(dims[1])
 
     # Bounds
-    x_min = float(dims[0].get(f"{NS_G}min") or dims[0].get("min"))
-    x_max = float(dims[0].get(f"{NS_G}max") or dims[0].get("max"))
-    y_min = float(dims[1].get(f"{NS_G}min") or dims[1].get("min"))
-    y_max = float(dims[1].get(f"{NS_G}max") or dims[1].get("max"))
+    x_min = float(dims[0].get(_MIN_ATTR) or dims[0].get("min"))
+    x_max = float(dims[0].get(_MAX_ATTR) or dims[0].get("max"))
+    y_min = float(dims[1].get(_MIN_ATTR) or dims[1].get("min"))
+    y_max = float(dims[1].get(_MAX_ATTR) or dims[1].get("max"))
 
     # Represent as polygon
     return {
@@ -124,16 +136,16 @@ def parse_gatingml_gate(gate_el):
     """
 
     # Polygon ---------------------------------------
-    poly = gate_el.find(f"{NS_G}PolygonGate")
+    poly = gate_el.find(_POLYGON_TAG)
     if poly is not None:
         return parse_polygon_gate(poly)
 
     # Rectangle -------------------------------------
-    rect = gate_el.find(f"{NS_G}RectangleGate")
+    rect = gate_el.find(_RECTANGLE_TAG)
     if rect is not None:
         return parse_rectangle_gate(rect)
 
     # Unsupported gate types (RangeGate, BooleanGate, etc.)
     print("WARNING: Unsupported Gating-ML 2.0 gate:\n",
-          ET.tostring(gate_el, encoding="unicode"))
+          etree.tostring(gate_el, encoding="unicode"))
     return None
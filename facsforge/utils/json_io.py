@@ -0,0 +1,17 @@
+"""
+JSON reading with orjson when it is installed.
+
+orjson parses several times faster than the stdlib json module and returns
+the same Python objects; without it json.loads is used.
+"""
+
+try:
+    from orjson import loads as _loads
+except ImportError:
+    from json import loads as _loads
+
+
+def load_json(path):
+    """Parse the JSON file at path."""
+    with open(path, "rb") as f:
+        return _loads(f.read())
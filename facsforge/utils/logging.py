@@ -1,3 +1,12 @@
+import os
+
+# FACSFORGE_LOG=DEBUG enables the developer trace messages
+_DEBUG = os.environ.get("FACSFORGE_LOG", "").upper() == "DEBUG"
+
+def log_debug(msg):
+    if _DEBUG:
+        print(f"[FACSForge:DEBUG] {msg}")
+
 def log_info(msg):
     print(f"[FACSForge] {msg}")
 
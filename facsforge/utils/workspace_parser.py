@@ -0,0 +1,185 @@
+"""
+Streaming FlowJo workspace scanner.
+
+FlowJo workspaces (the v9 XML files and the workspace.xml inside v10 ZIPs)
+are walked exactly once with lxml.etree.iterparse. Only the elements the
+converters need are looked at:
+
+    <Population>        name, nesting, gate ids and Gating-ML gate
+    <Parameter>         channel name and detector
+    <Keyword>           FCS keywords (P1N, P1D, ...)
+    <ExternalPopNode>   BD CellView gate path
+
+Elements are released as soon as they have been consumed, so no full DOM
+of the workspace is ever kept in memory.
+"""
+
+import sys
+
+from lxml import etree
+
+from .gatingml_parser import NS_G, parse_gatingml_gate
+
+_TAGS = ("Population", "Parameter", "Keyword", "ExternalPopNode")
+
+# Workspaces come from other people's machines: no entity expansion or
+# network access, and no ID table / whitespace nodes we would never read.
+# huge_tree stays off so libxml2 keeps its size and amplification limits.
+_PARSER_OPTIONS = dict(
+    resolve_entities=False,
+    no_network=True,
+    collect_ids=False,
+    remove_blank_text=True,
+)
+
+# FlowJo writes <Gate gating:id="..." gating:parent_id="..."> (tag without namespace)
+_GATE_ID = f"{NS_G}id"
+_GATE_PARENT_ID = f"{NS_G}parent_id"
+
+
+def _intern(s):
+    """
+    Population names, gate ids and channel names repeat once per sample
+    and end up as dict keys everywhere - keep a single copy of each.
+    """
+    return sys.intern(s) if s is not None else None
+
+
+def _release(el, prune=True):
+    """
+    Free a consumed element. With prune=True the already handled siblings
+    in front of it are dropped from the parent as well.
+    """
+    el.clear(keep_tail=True)
+    if not prune:
+        return
+    parent = el.getparent()
+    while el.getprevious() is not None:
+        del parent[0]
+
+
+def _split_gate_path(raw):
+    """'/Cells/Single Cells/' → ["Cells", "Single Cells"] (interned)"""
+    return [sys.intern(p) for p in map(str.strip, raw.split("/")) if p]
+
+
+def _gate_ids(pop_el, name, gate_names, gate_parents):
+    """
+    Record the gate ids of a <Population>.
+    FlowJo v10 uses <Gate gating:id=...>, older v9 files <gate ref=...>.
+
+    Returns: (gate_id or None, <Gate> element or None)
+    """
+    gate_el = pop_el.find("Gate")
+    if gate_el is not None:
+        gid = _intern(gate_el.get(_GATE_ID))
+        if gid is not None:
+            name_el = gate_el.find("name")
+            gate_names[gid] = _intern(name_el.text.strip()) if name_el is not None else name
+            gate_parents[gid] = _intern(gate_el.get(_GATE_PARENT_ID))  # may be None
+        return gid, gate_el
+
+    ref_el = pop_el.find("gate")
+    return (_intern(ref_el.get("ref")) if ref_el is not None else None), None
+
+
+def scan_workspace(source):
+    """
+    Stream a FlowJo workspace and collect everything the converters need.
+
+    source: path or binary file object of the workspace XML.
+
+    Returns dict:
+        populations:    { pop_name → {"parent": str or None, "gate": gate_def} }
+                        (only populations with a parseable gate, in document order)
+        pop_parent:     { pop_name → enclosing population name or None }
+        pop_gateid:     { pop_name → gate_id or None }
+        gate_names:     { gate_id → gate name }
+        gate_parents:   { gate_id → parent gate_id or None }
+        parameters:     { channel → detector or None }
+        keywords:       { keyword name → value }
+        external_paths: { pop_name → gate_path[] }
+    """
+    populations = {}
+    first_seen = {}
+    pop_parent = {}
+    pop_gateid = {}
+    gate_names = {}
+    gate_parents = {}
+    parameters = {}
+    keywords = {}
+    external_paths = {}
+
+    # (name, document position) of the currently open <Population> elements
+    open_pops = []
+    seq = 0
+
+    for event, el in etree.iterparse(
+        source, events=("start", "end"), tag=_TAGS, **_PARSER_OPTIONS
+    ):
+        tag = el.tag
+
+        if tag == "Population":
+            if event == "start":
+                name = _intern(el.get("name"))
+                pop_parent[name] = open_pops[-1][0] if open_pops else None
+                pop_gateid[name] = None
+                open_pops.append((name, seq))
+                seq += 1
+                continue
+
+            name, pos = open_pops.pop()
+            gid, gate_el = _gate_ids(el, name, gate_names, gate_parents)
+            pop_gateid[name] = gid
+
+            gate_def = parse_gatingml_gate(gate_el) if gate_el is not None else None
+            if gate_def is not None:
+                first_seen.setdefault(name, pos)
+                populations[name] = {
+                    "parent": _intern(el.get("parent")),
+                    "gate": gate_def,
+                }
+            _release(el)
+            continue
+
+        if event == "start":
+            continue
+
+        if tag == "Parameter":
+            name = el.get("name") or el.get("shortName") or el.get("longName")
+            if name:
+                name = _intern(name)
+                det = el.find("Detector")
+                parameters[name] = det.text if det is not None else None
+            # <Parameter> can sit next to elements still needed by its parent
+            _release(el, prune=False)
+
+        elif tag == "Keyword":
+            keywords[el.get("name")] = el.get("value")
+            _release(el)
+
+        elif tag == "ExternalPopNode":
+            lens = el.find(".//BD_CellView_Lens")
+            if lens is not None:
+                name = lens.get("population")
+                raw = lens.get("path")
+                if name and raw:
+                    external_paths[_intern(name)] = _split_gate_path(raw)
+            _release(el)
+
+    # keep the populations in the order FlowJo lists them
+    populations = {
+        name: populations[name]
+        for name in sorted(populations, key=first_seen.__getitem__)
+    }
+
+    return {
+        "populations": populations,
+        "pop_parent": pop_parent,
+        "pop_gateid": pop_gateid,
+        "gate_names": gate_names,
+        "gate_parents": gate_parents,
+        "parameters": parameters,
+        "keywords": keywords,
+        "external_paths": external_paths,
+    }
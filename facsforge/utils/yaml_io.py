@@ -0,0 +1,43 @@
+"""
+YAML reading / writing with the libyaml backend.
+
+PyYAML's CSafeLoader / CSafeDumper are several times faster than the pure
+Python SafeLoader / SafeDumper and produce the same documents. PyYAML built
+without libyaml falls back to the pure Python classes (with one warning).
+"""
+
+import yaml
+
+from facsforge.utils.logging import log_warn
+
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+    log_warn("PyYAML was built without libyaml - using the slow pure Python YAML backend")
+
+
+def load_yaml(stream):
+    """
+    yaml.safe_load with the fastest available loader.
+    Pass files opened in binary mode: libyaml then decodes the bytes
+    itself (UTF-8/16, BOM aware) instead of Python's text layer.
+    """
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+class _NoAliasDumper(SafeDumper):
+    """Writes repeated objects out in full instead of as &anchor / *alias."""
+
+    def ignore_aliases(self, data):
+        return True
+
+
+def dump_yaml(data, stream=None, aliases=True, **kwargs):
+    """
+    yaml.safe_dump with the fastest available dumper.
+    aliases=False writes shared objects in full: the document then has
+    no anchors and can be concatenated with other dumps.
+    """
+    dumper = SafeDumper if aliases else _NoAliasDumper
+    return yaml.dump(data, stream, Dumper=dumper, **kwargs)
@@ -18,23 +18,146 @@ For now this file defines:
  - entrypoint function `run_server()`
 """
 
+import atexit
+import copy
+import hashlib
 import os
-import yaml
-from flask import Flask, render_template, request, jsonify
+import re
+import shutil
+import tempfile
+import threading
+import zlib
+from dataclasses import dataclass, field
+from typing import Optional
+from flask import Flask, Response, render_template, request, jsonify
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge, UnsupportedMediaType
+from jsonschema import Draft202012Validator
+from jsonschema.exceptions import best_match
+
+from facsforge.utils.yaml_io import load_yaml, dump_yaml
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson (used when it is installed).
+    Output matches the default provider: sorted keys, and dates plus
+    anything else orjson does not know go through DefaultJSONProvider.default.
+    """
+    _OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+                | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
 
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
-# ------------------------------------------------------------
-# Globals (simple for now – replaced later with a class)
-# ------------------------------------------------------------
 
 app = Flask(
     __name__,
     template_folder="templates",
     static_folder="static"
 )
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+
+# ------------------------------------------------------------
+# Config state
+# ------------------------------------------------------------
+
+@dataclass
+class ConfigStore:
+    """
+    The config edited by the web interface.
 
-CONFIG_DATA = {}
-CONFIG_PATH = None
+    `data` is never modified in place: every edit builds a new top-level
+    dict and bumps `version` under `lock`. A snapshot therefore stays
+    valid while it is encoded or written, and anything derived from the
+    config (JSON bodies, the saved file) can be keyed by `version`.
+    """
+    data: dict = field(default_factory=dict)
+    path: Optional[str] = None
+    version: int = 0
+    saved_version: int = 0
+    saved_digest: Optional[bytes] = None
+    lock: threading.RLock = field(default_factory=threading.RLock, repr=False)
+
+    def snapshot(self):
+        """(data, version) of the current config."""
+        with self.lock:
+            return self.data, self.version
+
+    def replace(self, path, data):
+        """Swap in a freshly loaded config (in sync with the file)."""
+        with self.lock:
+            self.path = path
+            self.data = data
+            self.version += 1
+            self.saved_version = self.version
+            self.saved_digest = None
+
+    def set_section(self, name, value):
+        """Rebind one top-level section."""
+        with self.lock:
+            self.data = {**self.data, name: value}
+            self.version += 1
+
+    def update(self, sections):
+        """Rebind several top-level sections."""
+        with self.lock:
+            self.data = {**self.data, **sections}
+            self.version += 1
+
+
+STORE = ConfigStore()
+
+# Edits arrive in bursts (panel / gate editing); the YAML is written at
+# most once per _SAVE_DELAY seconds after the last change, or right away
+# on an explicit /api/save and at exit.
+_SAVE_DELAY = 0.25
+_save_timer = None
+
+# { section → (version, encoded JSON, ETag) } of the GET endpoints
+_json_cache = {}
+
+# (version, rendered HTML) of the landing page
+_index_cache = (None, None)
+
+# { abspath → ((mtime_ns, size), parsed config) } of load_config
+_PARSE_CACHE = {}
+
+# { section → (section object, its YAML) } of the last write; sections are
+# rebound, never changed in place (see ConfigStore), so an identical
+# object means identical YAML
+_section_yaml = {}
+
+# Largest accepted decompressed request body without MAX_CONTENT_LENGTH
+_MAX_JSON_BYTES = 64 * 1024 * 1024
+
+# Gate names end up as YAML keys and in gate paths: printable, no '/'
+# (the gate path separator), at most 128 characters
+_GATENAME_RE = re.compile(r"[^\x00-\x1f\x7f/]{1,128}")
+
+# Shape of a POST /api/gates payload, compiled once
+_GATES_VALIDATOR = Draft202012Validator({
+    "type": "object",
+    "additionalProperties": {
+        "type": "object",
+        "required": ["gate"],
+        "properties": {
+            "parent": {"type": ["string", "null"]},
+            "positive": {"type": "array", "items": {"type": "string"}},
+            "negative": {"type": "array", "items": {"type": "string"}},
+            "gate": {},
+        },
+    },
+})
 
 
 # ------------------------------------------------------------
@@ -43,35 +166,192 @@ CONFIG_PATH = None
 
 def load_config(path):
     """Load a FACSForge YAML config into memory."""
-    global CONFIG_DATA, CONFIG_PATH
-    CONFIG_PATH = os.path.abspath(path)
-
-    if not os.path.exists(CONFIG_PATH):
-        raise FileNotFoundError(f"Config file not found: {CONFIG_PATH}")
-
-    with open(CONFIG_PATH) as f:
-        CONFIG_DATA = yaml.safe_load(f) or {}
+    path = os.path.abspath(path)
+
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Config file not found: {path}") from None
+
+    # an unchanged file is not parsed again; callers get their own copy
+    stamp = (st.st_mtime_ns, st.st_size)
+    known_stamp, parsed = _PARSE_CACHE.get(path, (None, None))
+    if known_stamp != stamp:
+        with open(path, "rb") as f:
+            parsed = load_yaml(f) or {}
+        _PARSE_CACHE[path] = (stamp, parsed)
+    data = copy.deepcopy(parsed)
 
     # Add default structure if missing
-    CONFIG_DATA.setdefault("panel", {})
-    CONFIG_DATA.setdefault("celltypes", {})
-    CONFIG_DATA.setdefault("umap", {"enabled": False})
-    CONFIG_DATA.setdefault("metadata", {})
+    data.setdefault("panel", {})
+    data.setdefault("celltypes", {})
+    data.setdefault("umap", {"enabled": False})
+    data.setdefault("metadata", {})
 
-    return CONFIG_DATA
+    STORE.replace(path, data)
+    return data
 
 
 def save_config():
-    """Save the in-memory CONFIG_DATA back to disk."""
-    if CONFIG_PATH is None:
-        return False
+    """
+    Schedule writing the in-memory config to disk (see flush_config);
+    edits within _SAVE_DELAY seconds end up in a single write.
+    """
+    global _save_timer
+    with STORE.lock:
+        if STORE.path is None:
+            return False
+        if _save_timer is None:
+            _save_timer = threading.Timer(_SAVE_DELAY, flush_config)
+            _save_timer.daemon = True
+            _save_timer.start()
+
+    return True
 
-    with open(CONFIG_PATH, "w") as f:
-        yaml.safe_dump(CONFIG_DATA, f, sort_keys=False)
+
+def flush_config(force=False):
+    """
+    Write the in-memory config to disk now, if it has changed since it
+    was loaded or last written (or always, with force=True).
+    """
+    global _save_timer
+    with STORE.lock:
+        if _save_timer is not None:
+            _save_timer.cancel()
+            _save_timer = None
+        data, version = STORE.snapshot()
+        if STORE.path is None or (version == STORE.saved_version and not force):
+            return False
+
+        text = _dump_sections(data).encode()
+
+        # edits that end up where the last write left off need no write
+        digest = hashlib.blake2b(text, digest_size=16).digest()
+        if digest == STORE.saved_digest and not force:
+            STORE.saved_version = version
+            return False
+
+        # temp file + os.replace: readers never see a half written config
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(STORE.path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(text)
+            if os.path.exists(STORE.path):
+                shutil.copymode(STORE.path, tmp)
+            os.replace(tmp, STORE.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        STORE.saved_version = version
+        STORE.saved_digest = digest
 
     return True
 
 
+atexit.register(flush_config)
+
+
+def _dump_sections(data):
+    """
+    YAML of the config, section by section: only sections that were
+    rebound since the last write are serialised again.
+
+    The sections are dumped without aliases: PyYAML numbers anchors per
+    dump, so concatenated dumps could repeat an anchor name (&id001)
+    and the file would not load again.
+    """
+    if not data:
+        return dump_yaml(data, sort_keys=False)
+
+    parts = []
+    for key, value in data.items():
+        cached = _section_yaml.get(key)
+        if cached is None or cached[0] is not value:
+            cached = _section_yaml[key] = (
+                value, dump_yaml({key: value}, aliases=False, sort_keys=False)
+            )
+        parts.append(cached[1])
+
+    for key in _section_yaml.keys() - data.keys():
+        del _section_yaml[key]
+
+    return "".join(parts)
+
+
+def _json_response(section=None):
+    """
+    GET response with config[section] (or the whole config) as JSON.
+    The encoded body and its ETag are kept per config version, so an
+    unchanged config is neither re-encoded nor re-sent (304).
+    """
+    data, version = STORE.snapshot()
+    cached = _json_cache.get(section)
+    if cached is None or cached[0] != version:
+        body = app.json.dumps(data if section is None else data.get(section, {})).encode()
+        cached = _json_cache[section] = (version, body, hashlib.sha1(body).hexdigest())
+
+    _, body, etag = cached
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+def _gunzip(data):
+    """
+    Decompress a gzip request body, at most MAX_CONTENT_LENGTH (or
+    _MAX_JSON_BYTES) bytes of output: MAX_CONTENT_LENGTH alone only caps
+    the compressed size, and a few KB of gzip can inflate to gigabytes.
+    """
+    limit = app.config.get("MAX_CONTENT_LENGTH") or _MAX_JSON_BYTES
+    inflate = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        out = inflate.decompress(data, limit)
+        if inflate.unconsumed_tail:
+            raise RequestEntityTooLarge(f"Decompressed request body exceeds {limit} bytes")
+        if not inflate.eof:
+            raise BadRequest("Truncated gzip request body")
+    except zlib.error:
+        raise BadRequest("Invalid gzip request body") from None
+    return out
+
+
+def _read_json():
+    """
+    The JSON request body (like request.json), also accepted gzip
+    compressed (Content-Encoding: gzip) as the gate editor sends it.
+    """
+    if not request.is_json:
+        raise UnsupportedMediaType("Expected a JSON request body")
+
+    data = request.get_data(cache=False)
+    if request.content_encoding == "gzip":
+        data = _gunzip(data)
+
+    try:
+        return app.json.loads(data)
+    except ValueError:
+        raise BadRequest("Invalid JSON request body") from None
+
+
+def _check_gates(payload):
+    """
+    Validate a gate structure (see api_gates) and fill in the optional
+    fields. Returns an error message, or None if the payload is fine.
+    """
+    error = best_match(_GATES_VALIDATOR.iter_errors(payload))
+    if error is not None:
+        where = f"Gate '{error.absolute_path[0]}': " if error.absolute_path else ""
+        return where + error.message
+
+    for name, info in payload.items():
+        if not _GATENAME_RE.fullmatch(name):
+            return f"Invalid gate name {name!r}"
+        info.setdefault("parent", None)
+        info.setdefault("positive", [])
+        info.setdefault("negative", [])
+    return None
+
+
 # ------------------------------------------------------------
 # Web Routes
 # ------------------------------------------------------------
@@ -84,8 +364,16 @@ def index():
     Shows a landing page with:
      - overview of the loaded config
      - links to each workflow step (panels, gates, UMAP, seq linking, etc.)
+
+    The page is rendered once per config version.
     """
-    return render_template("index.html", config=CONFIG_DATA)
+    global _index_cache
+    data, version = STORE.snapshot()
+    cached_version, html = _index_cache
+    if cached_version != version:
+        html = render_template("index.html", config=data)
+        _index_cache = (version, html)
+    return Response(html, mimetype="text/html")
 
 
 @app.route("/api/panel", methods=["GET", "POST"])
@@ -94,14 +382,14 @@ def api_panel():
     API to GET or UPDATE the panel section.
     """
     if request.method == "GET":
-        return jsonify(CONFIG_DATA.get("panel", {}))
+        return _json_response("panel")
 
     if request.method == "POST":
-        payload = request.json
+        payload = _read_json()
         if not isinstance(payload, dict):
             return jsonify({"error": "Invalid panel format"}), 400
 
-        CONFIG_DATA["panel"] = payload
+        STORE.set_section("panel", payload)
         save_config()
         return jsonify({"status": "ok"})
 
@@ -113,9 +401,9 @@ def api_config():
     POST: replace config
     """
     if request.method == "GET":
-        return jsonify(CONFIG_DATA)
+        return _json_response()
 
-    CONFIG_DATA.update(request.json)
+    STORE.update(_read_json())
     save_config()
     return jsonify({"status": "saved"})
 
@@ -128,13 +416,13 @@ def api_config():
 def api_gates():
     """
     GET:
-        Returns the entire gate + celltype structure from CONFIG_DATA["celltypes"].
+        Returns the entire gate + celltype structure (config["celltypes"]).
         This includes:
             - parent
             - positive / negative marker annotations
             - gate geometry (polygon / rectangle / threshold)
     POST:
-        Replaces CONFIG_DATA["celltypes"] with the provided gate structure.
+        Replaces config["celltypes"] with the provided gate structure.
 
         Expected format:
             {
@@ -150,44 +438,65 @@ def api_gates():
 
     # GET request → return entire structure
     if request.method == "GET":
-        return jsonify(CONFIG_DATA.get("celltypes", {}))
+        return _json_response("celltypes")
 
     # POST request → update gates
-    payload = request.json
+    payload = _read_json()
 
-    if not isinstance(payload, dict):
-        return jsonify({"error": "Gate data must be a dictionary"}), 400
+    error = _check_gates(payload)
+    if error is not None:
+        return jsonify({"error": error}), 400
 
-    # Basic validation: every entry must have required fields
-    for gatename, info in payload.items():
-        if not isinstance(info, dict):
-            return jsonify({"error": f"Gate '{gatename}' must be a dict"}), 400
+    # Everything looks OK → apply update
+    STORE.set_section("celltypes", payload)
+    save_config()
 
-        if "gate" not in info:
-            return jsonify({"error": f"Gate '{gatename}' is missing its 'gate' geometry"}), 400
+    return jsonify({"status": "gates saved"})
 
-        info.setdefault("parent", None)
-        info.setdefault("positive", [])
-        info.setdefault("negative", [])
 
-        # Ensure list types
-        if not isinstance(info["positive"], list):
-            return jsonify({"error": f"Gate '{gatename}': 'positive' must be a list"}), 400
-        if not isinstance(info["negative"], list):
-            return jsonify({"error": f"Gate '{gatename}': 'negative' must be a list"}), 400
+# ------------------------------------------------------------
+# BATCH API
+# ------------------------------------------------------------
 
-    # Everything looks OK → apply update
-    CONFIG_DATA["celltypes"] = payload
+@app.route("/api/batch", methods=["POST"])
+def api_batch():
+    """
+    Update several config sections in one request (preferred over
+    separate /api/panel, /api/gates, ... calls): one round-trip, one
+    validation pass and one write.
+
+    Expected format:
+        {
+          "panel":     {...},     (as for /api/panel)
+          "celltypes": {...},     (as for /api/gates)
+          "metadata":  {...},
+          ...                     (any other top-level section)
+        }
+
+    Nothing is applied unless every section is valid.
+    """
+    payload = _read_json()
+    if not isinstance(payload, dict):
+        return jsonify({"error": "Batch data must be a dictionary"}), 400
+
+    if "panel" in payload and not isinstance(payload["panel"], dict):
+        return jsonify({"error": "Invalid panel format"}), 400
+
+    if "celltypes" in payload:
+        error = _check_gates(payload["celltypes"])
+        if error is not None:
+            return jsonify({"error": error}), 400
 
+    STORE.update(payload)
     save_config()
 
-    return jsonify({"status": "gates saved"})
+    return jsonify({"status": "ok", "applied": list(payload)})
 
 
 @app.route("/api/save", methods=["POST"])
 def api_save():
-    """Explicit save request."""
-    save_config()
+    """Explicit save request: write pending changes immediately."""
+    flush_config(force=True)
     return jsonify({"status": "saved"})
 
 
@@ -195,19 +504,34 @@ def api_save():
 # Server Entrypoint
 # ------------------------------------------------------------
 
-def run_server(config_path, host="127.0.0.1", port=8080):
+def run_server(config_path, host="127.0.0.1", port=8080, dev=False, threads=8):
     """
     Start the FACSForge web server.
     Used by CLI:
         facsforge web <config.yaml>
+
+    Requests are served by waitress (pip install facsforge[web]) with
+    `threads` worker threads; without waitress, or with dev=True, Flask's
+    own threaded development server is used (dev=True also enables
+    debug mode with auto reload).
     """
     print(f"🔧 Loading config: {config_path}")
     load_config(config_path)
 
+    serve = None
+    if not dev:
+        try:
+            from waitress import serve
+        except ImportError:
+            print("waitress is not installed - using Flask's development server")
+
     print(f"🌐 Starting FACSForge Web at http://{host}:{port}")
     print("Press Ctrl+C to stop.\n")
 
-    app.run(host=host, port=port, debug=False)
+    if serve is not None:
+        serve(app, host=host, port=port, threads=threads)
+    else:
+        app.run(host=host, port=port, debug=dev, threaded=True)
 
 
 # CLI will import run_server(), not Flask app directly
@@ -3,7 +3,16 @@
 import pytest
 from pathlib import Path
 
+from facsforge.utils.cache import CODE_VERSION
+
 @pytest.fixture
 def data_dir():
     return Path(__file__).parent / "data"
 
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch):
+    # keep the on-disk facsforge cache out of the user's home
+    # and return the directory of this code version's entries
+    cache = tmp_path / "cache"
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache))
+    return cache / "facsforge" / CODE_VERSION
@@ -1,15 +1,14 @@
 import os
 import subprocess
-import tempfile
-import pytest
-from facsforge.core.loader import load_experiment
 import sys
 
+from facsforge.core.loader import load_experiment
+
 def test_flowjo2own_cli_runs():
     """
     This test verifies that the CLI command:
 
-        facsforge flowjo2own <file.wsp>
+        facsforge flowjo9_to_facsforge --wsp <file.wsp> --out <file.yaml>
 
     - accepts the WSP path
     - does not fail with argument parsing errors
@@ -37,7 +36,7 @@ def test_flowjo2own_cli_runs():
     # -----------------------------------------
     # CLI must work
     # -----------------------------------------
-    assert result.returncode == 0, "CLI invocation failed"
+    assert result.returncode == 0, f"CLI invocation failed:\n{result.stderr}"
 
     # -----------------------------------------
     # Output must exist
@@ -0,0 +1,296 @@
+import numpy as np
+import pytest
+import pandas as pd
+from flowio import FlowData
+from facsforge.core.gating_engine import (
+    _apply_gate, _apply_marker_rules, _compensate_from_file, _event_matrix,
+    _fcs_spillover, _gating_order, _load_events, _plot_stamp, _write_csv,
+    run_gating_pipeline,
+)
+from facsforge.utils.yaml_io import load_yaml
+
+
+def _events():
+    df = pd.DataFrame({
+        "FSC-A": [1.0, 5.0, 10.0, 20.0, np.nan],
+        "CD3-A": [0.5, 3.0, 2.0, 9.0, 4.0],
+        "CD4-A": [7.0, 1.0, 8.0, 2.0, 9.0],
+    })
+    X = np.asfortranarray(df.to_numpy())
+    cols = {c: i for i, c in enumerate(df.columns)}
+    return X, cols, np.ones(len(df), dtype=bool)
+
+
+# -----------------------------
+# Test: positive/negative marker rules
+# -----------------------------
+def test_marker_rules():
+    X, cols, everything = _events()
+    rules = {"positive": ["CD3-A"], "negative": ["CD4-A"]}
+    thresholds = {"CD3-A": 1.0, "CD4-A": 5.0}
+
+    mask = _apply_marker_rules(X, cols, rules, thresholds, everything)
+    assert mask.tolist() == [False, True, False, True, False]
+
+    # only events of the parent population can pass
+    parent = np.array([True, False, True, True, True])
+    mask = _apply_marker_rules(X, cols, rules, thresholds, parent)
+    assert mask.tolist() == [False, False, False, True, False]
+
+    # no applicable rule → the population itself
+    assert _apply_marker_rules(X, cols, {"positive": ["CD8-A"]}, thresholds, parent) is parent
+
+
+# -----------------------------
+# Test: threshold gate (min/max inclusive)
+# -----------------------------
+def test_threshold_gate():
+    X, cols, everything = _events()
+    gate = {"type": "threshold", "channel": "FSC-A", "min": 5.0, "max": 10.0}
+
+    mask = _apply_gate(X, cols, gate, "mid", everything)
+    assert mask.tolist() == [False, True, True, False, False]
+
+
+# -----------------------------
+# Test: polygon gate
+# -----------------------------
+def test_polygon_gate():
+    X, cols, everything = _events()
+    gate = {
+        "type": "polygon",
+        "channels": ["FSC-A", "CD3-A"],
+        "vertices": [[0, 0], [12, 0], [12, 10], [0, 10]],
+    }
+
+    mask = _apply_gate(X, cols, gate, "box", everything)
+    assert mask.tolist() == [True, True, True, False, False]
+
+    parent = np.array([False, True, True, True, True])
+    mask = _apply_gate(X, cols, gate, "box", parent)
+    assert mask.tolist() == [False, True, True, False, False]
+
+
+# -----------------------------
+# Test: polygon kernel agrees with flowutils (edges and vertices included)
+# -----------------------------
+def test_polygon_matches_flowutils():
+    from flowutils.gating import points_in_polygon
+    from facsforge.core.gating_engine import _points_in_polygon
+
+    rng = np.random.default_rng(1)
+    vertices = np.array([[1, 1], [8, 2], [9, 8], [5, 9], [2, 7], [4, 4]], dtype=float)
+    points = rng.integers(0, 11, size=(2000, 2)).astype(float)
+
+    mask = _points_in_polygon(points[:, 0], points[:, 1], vertices)
+    assert (mask == points_in_polygon(vertices, points)).all()
+
+# -----------------------------
+# Test: gating order (parents first, broken trees fail)
+# -----------------------------
+def test_gating_order():
+    celltypes = {
+        "T4": {"parent": "T"},
+        "T": {"parent": "Lymphocytes"},
+        "Lymphocytes": {"parent": None},
+        "B": {"parent": "Lymphocytes"},
+    }
+    assert _gating_order(celltypes) == ["Lymphocytes", "T", "B", "T4"]
+
+    celltypes["orphan"] = {"parent": "missing"}
+    with pytest.raises(RuntimeError, match="orphan"):
+        _gating_order(celltypes)
+
+
+# -----------------------------
+# Test: rectangle gate (min <= value < max)
+# -----------------------------
+def test_rectangle_gate():
+    X, cols, everything = _events()
+    gate = {
+        "type": "rectangle",
+        "channels": ["FSC-A", "CD4-A"],
+        "vertices": [[1, 2], [10, 2], [10, 9], [1, 9]],
+    }
+
+    mask = _apply_gate(X, cols, gate, "rect", everything)
+    assert mask.tolist() == [True, False, False, False, False]
+
+
+# -----------------------------
+# Test: events are gated in float32 only when that is lossless
+# -----------------------------
+def test_event_matrix_precision():
+    events = np.array([[1.5, 2.0], [np.nan, 65535.0]])
+    X = _event_matrix(events)
+    assert X.dtype == np.float32 and X.flags.f_contiguous
+    assert np.array_equal(X, events, equal_nan=True)
+
+    events[0, 0] = 0.1
+    assert _event_matrix(events).dtype == np.float64
+
+
+# -----------------------------
+# Test: compensation matrix from a CSV file
+# -----------------------------
+def test_compensate_from_file(tmp_path):
+    spill = pd.DataFrame(
+        [[1.0, 0.1], [0.05, 1.0]],
+        index=["CD4-A", "CD3-A"], columns=["CD4-A", "CD3-A"],
+    )
+    path = tmp_path / "spill.csv"
+    spill.to_csv(path)
+
+    X, cols, _ = _events()
+    raw = X.copy()
+    comp = _compensate_from_file(X, list(cols), path)
+
+    # spillover of the compensated events gives back the measured ones
+    assert np.allclose(comp[:, [2, 1]] @ spill.to_numpy(), raw[:, [2, 1]])
+    assert np.array_equal(comp[:, 0], raw[:, 0], equal_nan=True)
+
+    spill.columns = ["CD4-A", "CD8-A"]
+    spill.to_csv(path)
+    with pytest.raises(RuntimeError, match="CD8-A"):
+        _compensate_from_file(raw.copy(), list(cols), path)
+
+
+# -----------------------------
+# Test: plot stamps follow the gates of a population and its ancestors
+# -----------------------------
+def test_plot_stamp(data_dir):
+    fcs, index = data_dir / "two_cells.fcs", data_dir / "two_cells.csv"
+    experiment = {
+        "panel": {},
+        "celltypes": {
+            "Cells": {"parent": None, "gate": {"type": "threshold", "channel": "FSC-A", "min": 1}},
+            "T": {"parent": "Cells", "positive": ["CD3-A"]},
+            "B": {"parent": "Cells", "positive": ["CD19-A"]},
+        },
+    }
+    stamp_t = _plot_stamp(fcs, index, experiment, "T")
+    stamp_b = _plot_stamp(fcs, index, experiment, "B")
+    assert stamp_t == _plot_stamp(fcs, index, experiment, "T")
+
+    experiment["celltypes"]["B"]["positive"] = ["CD20-A"]
+    assert _plot_stamp(fcs, index, experiment, "T") == stamp_t
+    assert _plot_stamp(fcs, index, experiment, "B") != stamp_b
+
+    experiment["celltypes"]["Cells"]["gate"]["min"] = 2
+    assert _plot_stamp(fcs, index, experiment, "T") != stamp_t
+
+
+# -----------------------------
+# Test: plot stamps follow the compensation matrix and the drawn events
+# -----------------------------
+def test_plot_stamp_data(data_dir, tmp_path):
+    fcs, index = data_dir / "two_cells.fcs", data_dir / "two_cells.csv"
+    spill = tmp_path / "spill.csv"
+    spill.write_text(",CD3-A,CD4-A\nCD3-A,1.0,0.1\nCD4-A,0.05,1.0\n")
+    experiment = {
+        "panel": {},
+        "compensation": {"source": "file", "path": str(spill)},
+        "celltypes": {"T": {"parent": None, "positive": ["CD3-A"]}},
+    }
+    parent = np.array([True, True, True, False])
+    mask = np.array([True, False, True, False])
+    stamp = _plot_stamp(fcs, index, experiment, "T", parent, mask)
+    assert stamp == _plot_stamp(fcs, index, experiment, "T", parent, mask)
+
+    # same matrix path, edited matrix
+    spill.write_text(",CD3-A,CD4-A\nCD3-A,1.0,0.25\nCD4-A,0.05,1.0\n")
+    edited = _plot_stamp(fcs, index, experiment, "T", parent, mask)
+    assert edited != stamp
+
+    # same settings, different events in the gate (e.g. new thresholds)
+    assert _plot_stamp(fcs, index, experiment, "T", parent, ~mask) != edited
+    assert _plot_stamp(fcs, index, experiment, "T", None, mask) != edited
+
+
+# -----------------------------
+# Test: cached thresholds follow the compensation matrix contents
+# -----------------------------
+def test_threshold_cache_follows_matrix(data_dir, tmp_path, cache_home):
+    fcs, index = data_dir / "two_cells.fcs", data_dir / "two_cells.csv"
+    with open(data_dir / "two_cells.yaml", "rb") as f:
+        experiment = load_yaml(f)
+    spill = tmp_path / "spill.csv"
+    spill.write_text(",FSC-A,SSC (Violet)-A\nFSC-A,1.0,0.1\nSSC (Violet)-A,0.05,1.0\n")
+    experiment["compensation"] = {"source": "file", "path": str(spill)}
+    # a 1D gate: no plots, just gating and thresholds
+    experiment["celltypes"] = {
+        "Cells": {"parent": None, "gate": {"type": "threshold", "channel": "FSC-A", "min": 1}},
+    }
+
+    def cached():
+        return len(list((cache_home / "thresholds").glob("*.pkl")))
+
+    run_gating_pipeline(fcs, index, experiment, tmp_path / "out")
+    run_gating_pipeline(fcs, index, experiment, tmp_path / "out")
+    assert cached() == 1
+
+    spill.write_text(",FSC-A,SSC (Violet)-A\nFSC-A,1.0,0.25\nSSC (Violet)-A,0.05,1.0\n")
+    run_gating_pipeline(fcs, index, experiment, tmp_path / "out")
+    assert cached() == 2
+
+    run_gating_pipeline(fcs, index, experiment, tmp_path / "out", use_cache=False)
+    assert cached() == 2
+
+
+# -----------------------------
+# Test: batched auto-thresholds match the single column computation
+# -----------------------------
+def test_auto_thresholds():
+    from facsforge.core.thresholds import _compute_threshold, compute_auto_thresholds
+
+    rng = np.random.default_rng(0)
+    events = np.column_stack([
+        rng.normal(100, 10, 5000),
+        np.concatenate([rng.normal(10, 2, 2500), rng.normal(60, 5, 2500)]),
+        rng.integers(0, 1024, 5000),
+        np.full(5000, 3.0),
+    ])
+    cols = {"FSC-A": 0, "CD3-A": 1, "CD4-A": 2, "CD8-A": 3}
+    panel = {ch: {"fluor": None, "role": None, "ignore": False} for ch in cols}
+
+    for X in (np.asfortranarray(events), np.asfortranarray(events, dtype=np.float32)):
+        thresholds = compute_auto_thresholds(X, cols, {"panel": panel})
+        assert list(thresholds) == ["CD3-A", "CD4-A", "CD8-A"]
+        for ch, value in thresholds.items():
+            assert value == _compute_threshold(X[:, cols[ch]].astype(np.float64))
+
+
+# -----------------------------
+# Test: compensation matrix stored in the FCS file
+# -----------------------------
+def test_compensate_from_fcs(data_dir):
+    spill = _fcs_spillover({"spill": "2,CD4-A,CD3-A,1,0.1,0.05,1"})
+    assert spill.columns.tolist() == spill.index.tolist() == ["CD4-A", "CD3-A"]
+    assert spill.to_numpy().tolist() == [[1.0, 0.1], [0.05, 1.0]]
+    assert _fcs_spillover({}) is None
+
+    fcs = data_dir / "two_cells.fcs"
+    raw, channels = _load_events(fcs, {"compensation": {"source": "none"}})
+    comp, same = _load_events(fcs, {"compensation": {"source": "fcs"}})
+    assert same == channels
+
+    spill = _fcs_spillover(FlowData(str(fcs)).text)
+    idx = [channels.index(ch) for ch in spill.columns]
+    rest = [i for i in range(len(channels)) if i not in idx]
+    assert not np.allclose(comp[:, idx], raw[:, idx])
+    assert np.allclose(comp[:, idx] @ spill.to_numpy(), raw[:, idx])
+    assert np.array_equal(comp[:, rest], raw[:, rest], equal_nan=True)
+
+
+# -----------------------------
+# Test: population CSVs have a pandas-style header
+# -----------------------------
+def test_write_csv_header(tmp_path):
+    df = pd.DataFrame({"FSC-A": [1.5, 2.0], "a,b": [1.0, 2.0], 'say "hi"': [0.0, 1.0]})
+    dest = tmp_path / "gated.csv"
+    _write_csv(df, dest)
+
+    header = dest.read_text().splitlines()[0]
+    assert header == df.to_csv(index=False).splitlines()[0]
+    assert header == 'FSC-A,"a,b","say ""hi"""'
+    pd.testing.assert_frame_equal(pd.read_csv(dest), df, check_dtype=False)
@@ -48,5 +48,23 @@ def test_invalid_parent_reference(data_dir):
 
 def test_duplicate_panel_channels_fail(data_dir):
     cfg = data_dir / "invalid_duplicate_panel.yaml"
+    with pytest.raises(FACSForgeConfigError) as exc:
+        load_experiment(cfg)
+
+    assert "'CD3' and 'CD36'" in str(exc.value)
+
+
+# -----------------------------
+# Test: Cached configs follow edits of the YAML
+# -----------------------------
+def test_cached_config_follows_edits(data_dir, tmp_path, cache_home):
+    cfg = tmp_path / "config.yaml"
+    cfg.write_text((data_dir / "valid_basic.yaml").read_text())
+
+    first = load_experiment(cfg)
+    assert load_experiment(cfg) == first
+    assert len(list((cache_home / "experiment").glob("*.pkl"))) == 1
+
+    cfg.write_text(cfg.read_text().replace('parent: "debris"', 'parent: "missing"'))
     with pytest.raises(FACSForgeConfigError):
         load_experiment(cfg)
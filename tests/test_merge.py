@@ -0,0 +1,18 @@
+from facsforge.core.merge import merge_configs
+
+
+# -----------------------------
+# Test: only the top-level panel is merged channel by channel
+# -----------------------------
+def test_merge_configs_panel():
+    base = {"panel": {"CD3": {"fluor": "FITC"}}, "metadata": {"a": 1}}
+    new = {"panel": {"CD3": {"fluor": "PE"}, "CD4": {}}, "metadata": {"panel": {"x": 1}}}
+
+    merged = merge_configs(base, new)
+    assert merged["panel"] == {"CD3": {"fluor": "FITC"}, "CD4": {}}
+    # a nested 'panel' is an ordinary key, whether base has the parent or not
+    assert merged["metadata"] == {"a": 1, "panel": {"x": 1}}
+    assert merge_configs({}, new)["metadata"] == {"panel": {"x": 1}}
+
+    # neither input is modified
+    assert base == {"panel": {"CD3": {"fluor": "FITC"}}, "metadata": {"a": 1}}
@@ -0,0 +1,157 @@
+import gzip
+import json
+import time
+
+import pytest
+
+from facsforge.utils.yaml_io import load_yaml
+from facsforge.webapp import app as webapp
+
+
+@pytest.fixture
+def client(data_dir, tmp_path):
+    cfg = tmp_path / "config.yaml"
+    cfg.write_text((data_dir / "valid_basic.yaml").read_text())
+    webapp.load_config(cfg)
+    yield webapp.app.test_client()
+    # no pending timer may write into the next test's config
+    webapp.flush_config()
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return load_yaml(f)
+
+
+# -----------------------------
+# Test: saved configs load again (aliases in several sections)
+# -----------------------------
+def test_save_reload_round_trip(client, tmp_path):
+    cfg = tmp_path / "config.yaml"
+    cfg.write_text(
+        "panel:\n"
+        "  FSC-A: &scatter {fluor: null, role: scatter, ignore: false}\n"
+        "  SSC-A: *scatter\n"
+        "celltypes:\n"
+        "  cells:\n"
+        "    parent: null\n"
+        "    positive: &markers [FSC-A]\n"
+        "    gate: {type: threshold, channel: FSC-A, min: 1}\n"
+        "  more:\n"
+        "    parent: cells\n"
+        "    positive: *markers\n"
+        "    gate: {type: threshold, channel: SSC-A, min: 1}\n"
+    )
+    loaded = webapp.load_config(cfg)
+
+    client.post("/api/config", json={"metadata": {"operator": "me"}})
+    assert client.post("/api/save").status_code == 200
+
+    saved = _read(cfg)
+    assert saved == {**loaded, "metadata": {"operator": "me"}}
+    assert webapp.load_config(cfg) == saved
+
+
+# -----------------------------
+# Test: gzip request bodies, capped after decompression
+# -----------------------------
+def test_gzip_body_limit(client, monkeypatch):
+    headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+    body = gzip.compress(json.dumps({"g": {"gate": {}}}).encode())
+    assert client.post("/api/gates", data=body, headers=headers).status_code == 200
+    assert client.get("/api/gates").json["g"]["parent"] is None
+
+    assert client.post("/api/gates", data=b"not gzip", headers=headers).status_code == 400
+    assert client.post("/api/gates", data=body[:-8], headers=headers).status_code == 400
+
+    # 10 MB of JSON in a ~10 KB request
+    bomb = gzip.compress(b'{"x": "' + b" " * 10_000_000 + b'"}')
+    monkeypatch.setitem(webapp.app.config, "MAX_CONTENT_LENGTH", 1_000_000)
+    assert len(bomb) < 1_000_000
+    assert client.post("/api/config", data=bomb, headers=headers).status_code == 413
+    assert "x" not in client.get("/api/config").json
+
+
+# -----------------------------
+# Test: bursts of edits are written once, after the debounce delay
+# -----------------------------
+def test_debounced_save(client, tmp_path, monkeypatch):
+    cfg = tmp_path / "config.yaml"
+    before = cfg.read_bytes()
+    monkeypatch.setattr(webapp, "_SAVE_DELAY", 0.05)
+
+    for i in range(5):
+        client.post("/api/panel", json={f"CH{i}": {"fluor": None}})
+    assert cfg.read_bytes() == before
+
+    for _ in range(100):
+        if cfg.read_bytes() != before:
+            break
+        time.sleep(0.02)
+    assert _read(cfg)["panel"] == {"CH4": {"fluor": None}}
+
+    # an explicit save writes pending edits right away
+    client.post("/api/panel", json={"CH5": {}})
+    assert client.post("/api/save").json == {"status": "saved"}
+    assert _read(cfg)["panel"] == {"CH5": {}}
+
+
+# -----------------------------
+# Test: unchanged YAML is not written again
+# -----------------------------
+def test_no_write_for_unchanged_config(client, tmp_path):
+    cfg = tmp_path / "config.yaml"
+    assert webapp.flush_config() is False  # nothing edited since loading
+
+    client.post("/api/panel", json={"CH": {"fluor": "PE"}})
+    assert webapp.flush_config() is True
+    written = cfg.stat().st_mtime_ns
+
+    client.post("/api/panel", json={"CH": {"fluor": "PE"}})
+    assert webapp.flush_config() is False
+    assert cfg.stat().st_mtime_ns == written
+
+
+# -----------------------------
+# Test: GETs are cached per config version (ETag / 304)
+# -----------------------------
+def test_etag_and_cached_pages(client):
+    first = client.get("/api/panel")
+    etag = first.headers["ETag"]
+    assert client.get("/api/panel", headers={"If-None-Match": etag}).status_code == 304
+
+    page = client.get("/").data
+    assert client.get("/").data == page
+
+    client.post("/api/panel", json={"CH": {}})
+    changed = client.get("/api/panel", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json == {"CH": {}}
+    assert client.get("/").data != page
+
+
+# -----------------------------
+# Test: a batch is applied completely or not at all
+# -----------------------------
+def test_batch_all_or_nothing(client):
+    before = client.get("/api/config").json
+
+    r = client.post("/api/batch", json={
+        "panel": {"CH": {}},
+        "metadata": {"operator": "me"},
+        "celltypes": {"g": {"parent": None}},  # no gate geometry
+    })
+    assert r.status_code == 400
+    assert "'gate' is a required property" in r.json["error"]
+    assert client.get("/api/config").json == before
+
+    r = client.post("/api/batch", json={
+        "panel": {"CH": {}},
+        "celltypes": {"g": {"gate": {}}},
+    })
+    assert r.json["status"] == "ok"
+    assert sorted(r.json["applied"]) == ["celltypes", "panel"]
+    after = client.get("/api/config").json
+    assert after["panel"] == {"CH": {}}
+    assert after["celltypes"]["g"]["positive"] == []
+    assert after["metadata"] == before["metadata"]
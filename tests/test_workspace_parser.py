@@ -0,0 +1,57 @@
+from facsforge.cli.flowjo9_to_facsforge import convert_v9
+
+
+# -----------------------------
+# Test: hierarchy from ExternalPopNode gate paths
+# -----------------------------
+def test_hierarchy_from_external_nodes(data_dir):
+    data = convert_v9(data_dir / "AnalysisForE2-E3-Bioinformatics.wsp")
+    cts = data["celltypes"]
+
+    assert cts["Cells"]["parent"] is None
+    assert cts["Single Cells (SSC)"]["parent"] == "Cells"
+    assert cts["Erythrocytes"]["gate_path"][0] == "Cells"
+    assert cts["Erythrocytes"]["gate_path"][-1] == "Erythrocytes"
+
+
+# -----------------------------
+# Test: hierarchy from gate parent ids (no ExternalPopNode in workspace)
+# -----------------------------
+def test_hierarchy_from_gate_ids(data_dir):
+    data = convert_v9(data_dir / "01-Jun-2021.wsp")
+    cts = data["celltypes"]
+
+    assert cts["Lymphocytes"]["parent"] is None
+    assert cts["Live"]["parent"] == "Single Cells"
+    assert cts["Granulocytes"]["gate_path"] == [
+        "Lymphocytes", "Single Cells", "Live", "DN", "Granulocytes"
+    ]
+
+
+# -----------------------------
+# Test: converted workspaces are cached by content
+# -----------------------------
+def test_conversion_is_cached(data_dir, cache_home):
+    wsp = data_dir / "01-Jun-2021.wsp"
+
+    first = convert_v9(wsp)
+    assert len(list((cache_home / "flowjo9").glob("*.pkl"))) == 1
+
+    assert convert_v9(wsp) == first
+    assert convert_v9(wsp, use_cache=False) == first
+    assert len(list((cache_home / "flowjo9").glob("*.pkl"))) == 1
+
+
+# -----------------------------
+# Test: entries of other code versions are removed
+# -----------------------------
+def test_old_cache_versions_pruned(data_dir, cache_home):
+    stale = cache_home.parent / "0.0.1+0123456789abcdef" / "flowjo9"
+    stale.mkdir(parents=True)
+    (stale / "old.pkl").write_bytes(b"")
+
+    convert_v9(data_dir / "01-Jun-2021.wsp")
+    assert not stale.parent.exists()
+    assert sorted(d.name for d in cache_home.parent.iterdir()) == sorted(
+        ["digests", cache_home.name]
+    )